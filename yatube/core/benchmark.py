@@ -0,0 +1,255 @@
+"""Drives the WSGI application in-process and measures responses."""
+import json
+import subprocess
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from threading import Thread
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.db import connection, connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.utils.module_loading import import_string
+
+from .budgets import count_queries
+
+HOST = 'localhost'
+# Outside INTERNAL_IPS, so debug toolbar stays out of measurements.
+REMOTE_ADDR = '10.0.0.1'
+
+
+def get_application():
+    return import_string(settings.WSGI_APPLICATION)
+
+
+def login_cookies(user):
+    """Cookies of a fresh authenticated session with a CSRF token."""
+    engine = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+    session = engine()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    # get_token keeps the value of the cookie it would set in META.
+    request = HttpRequest()
+    get_token(request)
+    return {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+    }
+
+
+def call(application, method, path, data=None, cookies=None):
+    """Sends one request through application, returns status and body."""
+    body = urlencode(data or {}).encode() if method == 'POST' else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '' if method == 'POST' else urlencode(data or {}),
+        'SERVER_NAME': HOST,
+        'HTTP_HOST': HOST,
+        'REMOTE_ADDR': REMOTE_ADDR,
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    }
+    if cookies:
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in cookies.items()
+        )
+        token = cookies.get(settings.CSRF_COOKIE_NAME)
+        if token:
+            environ['HTTP_X_CSRFTOKEN'] = token
+    setup_testing_defaults(environ)
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        content = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0], content
+
+
+class CacheCounter:
+    """Counts hits and misses of the default cache in this thread."""
+
+    def __init__(self):
+        self.hits = self.misses = 0
+        self.in_get_many = False
+        self.cache = caches['default']
+        self._get = self.cache.get
+        self._get_many = self.cache.get_many
+
+    def get(self, key, default=None, version=None):
+        value = self._get(key, default, version)
+        if self.in_get_many:
+            # Backends without their own get_many call get per key.
+            return value
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        self.in_get_many = True
+        try:
+            found = self._get_many(keys, version=version)
+        finally:
+            self.in_get_many = False
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def __enter__(self):
+        self.cache.get = self.get
+        self.cache.get_many = self.get_many
+        return self
+
+    def __exit__(self, *exc_info):
+        del self.cache.get
+        del self.cache.get_many
+
+
+def measure(application, name, method, path, data=None, cookies=None):
+    """Makes a request, returns a sample tuple for summarize."""
+    with CacheCounter() as cache, count_queries() as queries:
+        started = time.perf_counter()
+        status, _ = call(application, method, path, data, cookies)
+        elapsed = time.perf_counter() - started
+    return name, status, elapsed, queries.count, cache.hits, cache.misses
+
+
+def _work(application, specs, samples):
+    try:
+        for spec in specs:
+            samples.append(measure(application, *spec))
+    finally:
+        connection.close()
+
+
+def run_threads(specs, threads):
+    """Measures specs split between threads, returns samples."""
+    application = get_application()
+    samples = []
+    if threads == 1:
+        for spec in specs:
+            samples.append(measure(application, *spec))
+        return samples
+    workers = [
+        Thread(target=_work, args=(application, specs[i::threads], samples))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def run(specs, threads=1, processes=1):
+    """Measures specs (name, method, path, data, cookies) concurrently.
+
+    Returns samples and wall duration of the whole run in seconds.
+    """
+    started = time.perf_counter()
+    if processes == 1:
+        samples = run_threads(specs, threads)
+    else:
+        # Forked children must not share the parent's connections.
+        connections.close_all()
+        with ProcessPoolExecutor(processes) as pool:
+            results = pool.map(
+                run_threads,
+                [specs[i::processes] for i in range(processes)],
+                [threads] * processes,
+            )
+            samples = [sample for result in results for sample in result]
+    return samples, time.perf_counter() - started
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(share * len(values)) - 1))
+    return values[index]
+
+
+def _stats(samples, duration):
+    latencies = sorted(sample[2] for sample in samples)
+    hits = sum(sample[4] for sample in samples)
+    lookups = hits + sum(sample[5] for sample in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[1] >= 500),
+        'rps': round(len(samples) / duration, 2) if duration else None,
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 3),
+        'p50_ms': round(1000 * percentile(latencies, 0.50), 3),
+        'p95_ms': round(1000 * percentile(latencies, 0.95), 3),
+        'p99_ms': round(1000 * percentile(latencies, 0.99), 3),
+        'queries_per_request': round(
+            sum(sample[3] for sample in samples) / len(samples), 2
+        ),
+        'cache_hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def summarize(samples, duration):
+    """Aggregates samples overall and per view name."""
+    views = defaultdict(list)
+    for sample in samples:
+        views[sample[0]].append(sample)
+    return {
+        'total': _stats(samples, duration),
+        'views': {name: _stats(view_samples, duration)
+                  for name, view_samples in sorted(views.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """Relative change of key metrics per view against baseline."""
+    changes = {}
+    for name, stats in current['views'].items():
+        before = baseline.get('views', {}).get(name)
+        if not before:
+            continue
+        changes[name] = {
+            metric: (
+                round((stats[metric] - before[metric]) / before[metric], 4)
+                if before[metric] else None
+            )
+            for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms',
+                           'queries_per_request')
+            if stats[metric] is not None and before[metric] is not None
+        }
+    return changes
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
@@ -0,0 +1,44 @@
+"""Declared limits of SQL queries made while serving a URL name.
+
+Budgets are set in settings.QUERY_BUDGETS and count every query of a
+request, including loading the session and the user, so they stay the
+same for any page size once related rows are joined or prefetched.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+@contextmanager
+def count_queries():
+    """Counts queries to every database made in this thread."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def get_budget(view_name):
+    """Returns budget of view_name, None if it has none."""
+    return settings.QUERY_BUDGETS.get(view_name)
@@ -0,0 +1,62 @@
+"""Versions of cached fragments bumped by writes.
+
+A fragment cached under the current version of the data it shows is
+never served again once any write bumps that version, so fragments can
+live for hours without getting stale.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import routers
+
+KEY_PREFIX = 'version'
+
+
+def _key(name):
+    return f'{KEY_PREFIX}:{name}'
+
+
+def _initial():
+    # Differs after a restart or eviction, so old fragments never match.
+    return int(time.time() * 1000)
+
+
+def get_versions(*names):
+    """Returns current versions of names joined into one string.
+
+    Requests reading from a replica get its sync point appended, so what
+    they cache is kept apart from data read from default.
+    """
+    keys = [_key(name) for name in names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial(), None)
+            versions[key] = cache.get(key)
+    joined = '.'.join(str(versions[key]) for key in keys)
+    point = routers.sync_point()
+    return joined if point is None else f'{joined}@{point}'
+
+
+def bump(*names):
+    """Makes fragments cached under names stale."""
+    for name in names:
+        key = _key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+
+
+def bump_on_commit(*names, using=None):
+    """Bumps names now and once more after the transaction commits.
+
+    Other workers may cache data of before the commit under the first
+    bump, the second one leaves those entries behind. Outside of a
+    transaction the write is already committed, one bump is enough.
+    """
+    bump(*names)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: bump(*names), using)
@@ -0,0 +1,282 @@
+"""Cache backends: metering of lookups and a cache shared by processes.
+
+SQLiteCache keeps entries in one SQLite file, so every worker process on
+a host sees the same fragments and the same versions bumped by writes.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import metrics
+
+# Lookups of keys with these prefixes are counted under the given name.
+METERED_PREFIXES = {
+    'template.cache.': 'fragments',
+    'card:': 'cards',
+    'page:': 'pages',
+}
+
+
+def _metered(key):
+    for prefix, name in METERED_PREFIXES.items():
+        if key.startswith(prefix):
+            return name
+    return None
+
+
+class MeteredCacheMixin:
+    """Counts hits and misses of metered keys of a cache backend."""
+
+    # Set while lookups are not counted one by one: get_many counts its
+    # keys itself and backends may implement it with get.
+    _unmetered = False
+
+    def _count(self, key, hit):
+        name = _metered(key)
+        if name:
+            metrics.inc('yatube_cache_requests_total',
+                        {'cache': name, 'result': 'hit' if hit else 'miss'})
+
+    def get(self, key, default=None, version=None):
+        sentinel = object()
+        value = super().get(key, sentinel, version)
+        if not self._unmetered:
+            self._count(key, value is not sentinel)
+        return default if value is sentinel else value
+
+    def peek(self, key, default=None, version=None):
+        """Same as get, but the lookup is not counted."""
+        self._unmetered = True
+        try:
+            return self.get(key, default, version)
+        finally:
+            self._unmetered = False
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        self._unmetered = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            self._unmetered = False
+        for key in keys:
+            self._count(key, key in found)
+        return found
+
+
+class MeteredLocMemCache(MeteredCacheMixin, LocMemCache):
+    pass
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY, value BLOB, expires REAL,'
+    ' accessed REAL NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size (bytes INTEGER NOT NULL)',
+    'INSERT INTO cache_size SELECT 0 WHERE NOT EXISTS '
+    '(SELECT 1 FROM cache_size)',
+    # Total size follows every change, eviction never sums the table.
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET bytes = bytes + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET bytes = bytes - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size '
+    'ON cache BEGIN '
+    'UPDATE cache_size SET bytes = bytes + new.size - old.size; END',
+)
+# Key, value, expires, accessed and size columns.
+UPSERT = (
+    'INSERT INTO cache VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE '
+    'SET value = excluded.value, expires = excluded.expires, '
+    'accessed = excluded.accessed, size = excluded.size'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class SQLiteCache(BaseCache):
+    """Cache in a SQLite file with LRU eviction over a byte limit.
+
+    LOCATION is the file path. OPTIONS: MAX_BYTES caps the size of
+    stored keys and values, ACCESS_RESOLUTION is how many seconds a
+    read may go without refreshing the entry recency, so hot keys do
+    not turn every read into a write. Integers are stored as SQLite
+    integers to make incr a single atomic UPDATE.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self.access_resolution = float(options.get('ACCESS_RESOLUTION', 1))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # One connection per thread, a forked child opens its own.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            db = sqlite3.connect(self.location, timeout=30,
+                                 isolation_level=None)
+            db.execute('PRAGMA journal_mode = wal')
+            db.execute('PRAGMA synchronous = normal')
+            for statement in SCHEMA:
+                db.execute(statement)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _row(self, key, value, timeout, now):
+        value = self._encode(value)
+        size = len(key) + (8 if isinstance(value, int) else len(value))
+        return key, value, self.get_backend_timeout(timeout), now, size
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _evict(self, db):
+        """Drops expired and then least recently used entries."""
+        (size,) = db.execute('SELECT bytes FROM cache_size').fetchone()
+        if size <= self.max_bytes:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        (size,) = db.execute('SELECT bytes FROM cache_size').fetchone()
+        # Frees a tenth more than needed so eviction is not run on
+        # every following write.
+        excess = size - self.max_bytes * 0.9
+        victims = []
+        for key, entry_size in db.execute(
+            'SELECT key, size FROM cache ORDER BY accessed'
+        ):
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= entry_size
+        db.executemany('DELETE FROM cache WHERE key = ?', victims)
+
+    def _write(self, statement, rows):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = db.executemany(statement, rows)
+            self._evict(db)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        row = self._row(self._key(key, version), value, timeout, now)
+        return self._write(
+            f'{UPSERT} WHERE cache.expires <= ?',
+            [(*row, now)],
+        ) > 0
+
+    def _get_many(self, keys):
+        """Returns values of alive keys among made keys."""
+        if not keys:
+            return {}
+        now = time.time()
+        db = self._db
+        rows = db.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({", ".join("?" * len(keys))}) AND {ALIVE}',
+            [*keys, now],
+        ).fetchall()
+        stale = [(now, key) for key, _, accessed in rows
+                 if now - accessed > self.access_resolution]
+        if stale:
+            db.executemany('UPDATE cache SET accessed = ? WHERE key = ?',
+                           stale)
+        return {key: self._decode(value) for key, value, _ in rows}
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {keys[key]: value
+                for key, value in self._get_many(list(keys)).items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        self._write(UPSERT, [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ])
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        cursor = self._db.execute(
+            f'UPDATE cache SET expires = ?, accessed = ? '
+            f'WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), now,
+             self._key(key, version), now),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            updated = db.execute(
+                f'UPDATE cache SET value = value + ?, accessed = ? '
+                f"WHERE key = ? AND typeof(value) = 'integer' AND {ALIVE}",
+                (delta, now, key, now),
+            ).rowcount
+            row = updated and db.execute(
+                'SELECT value FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        if not row:
+            raise ValueError(f"Key '{key}' not found")
+        return row[0]
+
+    def has_key(self, key, version=None):
+        return self._db.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany('DELETE FROM cache WHERE key = ?',
+                             [(self._key(key, version),) for key in keys])
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+
+class MeteredSQLiteCache(MeteredCacheMixin, SQLiteCache):
+    pass
@@ -1,4 +1,7 @@
+from django.conf import settings
+
+
 def cache(request):
     return {
-        'cache_page_timeout': 20
+        'cache_page_timeout': settings.FRAGMENT_CACHE_TIMEOUT
     }
@@ -1,6 +1,7 @@
 def nav_panel_names(request):
     nav_names = [{'url': 'about:author', 'name': 'Об авторе'},
-                 {'url': 'about:tech', 'name': 'Технологии'}]
+                 {'url': 'about:tech', 'name': 'Технологии'},
+                 {'url': 'posts:search', 'name': 'Поиск'}]
     auth_nav_names = nav_names.copy() + (
         [
             {'url': 'posts:post_create', 'name': 'Новая запись'},
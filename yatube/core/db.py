@@ -0,0 +1,76 @@
+"""SQLite connection tuning and retries of writes hitting a lock."""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+RETRIES = 3
+# Delay before the first retry, doubled for every next one.
+DELAY = 0.05
+
+_rollback = threading.local()
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Runs settings.SQLITE_PRAGMAS on every new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def on_rollback(callback):
+    """Calls callback when the view run by retry_on_busy fails.
+
+    For work a rolled back transaction leaves behind, like stored files.
+    Outside of retry_on_busy callback is never called.
+    """
+    callbacks = getattr(_rollback, 'callbacks', None)
+    if callbacks is not None:
+        callbacks.append(callback)
+
+
+@contextmanager
+def _undo_on_error():
+    _rollback.callbacks = callbacks = []
+    try:
+        yield
+    except BaseException:
+        for callback in reversed(callbacks):
+            callback()
+        raise
+    finally:
+        _rollback.callbacks = None
+
+
+def retry_on_busy(view):
+    """Runs a write view in a transaction, retried while SQLite is busy.
+
+    A deferred SQLite transaction that starts reading and then writes
+    fails at once when another connection wrote in between, waiting in
+    busy_timeout does not help, so the whole view is run again.
+    Callbacks passed to on_rollback undo the rest of a failed run.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        for attempt in range(RETRIES + 1):
+            try:
+                with _undo_on_error(), transaction.atomic():
+                    return view(request, *args, **kwargs)
+            except OperationalError as error:
+                if attempt == RETRIES or not is_busy(error):
+                    raise
+            for upload in request.FILES.values():
+                upload.seek(0)
+            time.sleep(DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+    return wrapper
@@ -0,0 +1,100 @@
+"""Cached values rebuilt by one worker while others keep serving.
+
+An entry keeps the value with its soft expiry time and the seconds it
+took to compute. It lives STALE_TIMEOUT longer than asked, so once it
+is due the worker that takes the lock key recomputes it and the others
+serve the stale copy instead of computing the same value at once. An
+entry may also be refreshed a bit before it is due, the more likely the
+closer the expiry and the slower the value (probabilistic early
+expiration), so hot entries are usually rebuilt before anyone sees them
+stale. On a plain miss other workers wait for the lock holder to fill
+the entry for up to LOCK_WAIT seconds.
+"""
+import math
+import random
+import time
+
+from django.core.cache import cache as default_cache
+
+from . import metrics
+
+# Seconds a due entry may still be served while it is rebuilt.
+STALE_TIMEOUT = 60
+# Seconds the lock lives if its holder dies while computing.
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2
+POLL_INTERVAL = 0.02
+# Above 1 favours earlier refreshes, below 1 later ones.
+BETA = 1
+
+
+def _lock_key(key):
+    return f'lock:{key}'
+
+
+def _compute(cache, key, compute, timeout, locked=True):
+    started = time.monotonic()
+    try:
+        value = compute()
+        delta = time.monotonic() - started
+        if timeout is None:
+            cache.set(key, (value, math.inf, delta), None)
+        else:
+            cache.set(key, (value, time.time() + timeout, delta),
+                      timeout + STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(_lock_key(key))
+    return value
+
+
+def _wait(cache, key):
+    """Polls for the entry computed by the lock holder.
+
+    The miss that led here is already counted, polls are not lookups.
+    """
+    get = getattr(cache, 'peek', cache.get)
+    started = time.monotonic()
+    entry, result = None, 'timeout'
+    while time.monotonic() - started < LOCK_WAIT:
+        time.sleep(POLL_INTERVAL)
+        entry = get(key)
+        if entry is not None:
+            result = 'filled'
+            break
+        if get(_lock_key(key)) is None:
+            result = 'abandoned'
+            break
+    metrics.observe('yatube_fragment_lock_wait_seconds', {},
+                    time.monotonic() - started)
+    metrics.inc('yatube_fragment_lock_waits_total', {'result': result})
+    return entry
+
+
+def get_or_set(key, compute, timeout, cache=default_cache):
+    """Returns the value under key, computing it at most once at a time.
+
+    compute is called without arguments. timeout is in seconds like for
+    cache.set, None keeps the value until it is evicted.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        if cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+            return _compute(cache, key, compute, timeout)
+        entry = _wait(cache, key)
+        if entry is None:
+            # The holder is slow or gone, do not keep the page waiting.
+            return _compute(cache, key, compute, timeout, locked=False)
+        return entry[0]
+    value, expires, delta = entry
+    now = time.time()
+    # 1 - random() lies in (0, 1], so the shift is never negative.
+    if now - delta * BETA * math.log(1 - random.random()) < expires:
+        return value
+    if not cache.add(_lock_key(key), 1, LOCK_TIMEOUT):
+        if now >= expires:
+            metrics.inc('yatube_fragment_stale_serves_total', {})
+        return value
+    if now < expires:
+        metrics.inc('yatube_fragment_early_refreshes_total', {})
+    return _compute(cache, key, compute, timeout)
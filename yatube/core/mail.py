@@ -0,0 +1,85 @@
+"""Outgoing email queued in the database and sent by a worker.
+
+Requests only insert an Outbox row, in the same transaction as the data
+the email is about, so they never wait for the mail server and a
+failing server never breaks them.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from .models import Outbox
+
+MAX_ATTEMPTS = 5
+# Delay before the second attempt, doubled for every next one.
+BACKOFF = timedelta(minutes=1)
+
+
+def enqueue(subject, body, recipients, from_email=None, html_body=''):
+    return Outbox.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients='\n'.join(recipients),
+    )
+
+
+def _message(entry, connection):
+    message = EmailMultiAlternatives(entry.subject,
+                                     entry.body,
+                                     entry.from_email,
+                                     entry.recipients.split('\n'),
+                                     connection=connection)
+    if entry.html_body:
+        message.attach_alternative(entry.html_body, 'text/html')
+    return message
+
+
+def _postpone(entry, error):
+    entry.attempts += 1
+    entry.error = repr(error)
+    entry.next_attempt = timezone.now() + BACKOFF * 2 ** (entry.attempts - 1)
+    entry.save(update_fields=['attempts', 'error', 'next_attempt'])
+
+
+def send_pending(limit=100):
+    """Sends due emails over one connection.
+
+    Returns numbers of sent and failed emails. Failed ones are retried
+    later with exponential backoff until MAX_ATTEMPTS. When the server
+    is unreachable the whole batch waits BACKOFF, attempts are not used
+    up by an outage.
+    """
+    entries = list(Outbox.objects.filter(
+        attempts__lt=MAX_ATTEMPTS,
+        next_attempt__lte=timezone.now(),
+    )[:limit])
+    if not entries:
+        return 0, 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        Outbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            error=repr(error),
+            next_attempt=timezone.now() + BACKOFF,
+        )
+        return 0, len(entries)
+    sent = []
+    failed = 0
+    try:
+        for entry in entries:
+            try:
+                connection.send_messages([_message(entry, connection)])
+            except Exception as error:
+                _postpone(entry, error)
+                failed += 1
+            else:
+                sent.append(entry.pk)
+    finally:
+        connection.close()
+        Outbox.objects.filter(pk__in=sent).delete()
+    return len(sent), failed
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+MANY = 10
+
+
+class Command(BaseCommand):
+    help = ('Times basic operations of the shared SQLite cache against '
+            'LocMem and file based caches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000)
+        parser.add_argument(
+            '--value-bytes',
+            type=int,
+            default=2048,
+            help='Size of stored values, about a rendered fragment.',
+        )
+
+    def handle(self, *args, **options):
+        count = options['operations']
+        value = 'x' * options['value_bytes']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'locmem': LocMemCache('bench', {
+                    'OPTIONS': {'MAX_ENTRIES': count * 2},
+                }),
+                'file': FileBasedCache(os.path.join(directory, 'files'), {
+                    'OPTIONS': {'MAX_ENTRIES': count * 2},
+                }),
+                'sqlite': SQLiteCache(os.path.join(directory, 'cache.db'),
+                                      {}),
+            }
+            operations = {
+                'set': lambda cache, i: cache.set(f'key{i}', value),
+                'get': lambda cache, i: cache.get(f'key{i}'),
+                'get miss': lambda cache, i: cache.get(f'missing{i}'),
+                f'get_many {MANY}': lambda cache, i: cache.get_many(
+                    [f'key{(i + j) % count}' for j in range(MANY)]
+                ),
+                'incr': lambda cache, i: cache.incr('counter'),
+            }
+            self.stdout.write(f'{"us per operation":<18}' + ''.join(
+                f'{name:>10}' for name in backends
+            ))
+            results = {name: [] for name in operations}
+            for cache in backends.values():
+                cache.set('counter', 0, timeout=None)
+                for name, operation in operations.items():
+                    started = time.perf_counter()
+                    for i in range(count):
+                        operation(cache, i)
+                    results[name].append(
+                        (time.perf_counter() - started) / count * 1e6
+                    )
+                cache.clear()
+            for name, timings in results.items():
+                self.stdout.write(f'{name:<18}' + ''.join(
+                    f'{timing:>10.1f}' for timing in timings
+                ))
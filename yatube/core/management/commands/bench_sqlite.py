@@ -0,0 +1,173 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmark import percentile
+from core.db import DELAY, RETRIES, is_busy
+from posts.models import Comment, Post, User
+
+# Pragmas of the default profile: rollback journal, full sync.
+DEFAULT_PRAGMAS = {'journal_mode': 'delete'}
+SAMPLE = 1000
+
+
+def _connect(path, pragmas):
+    # Autocommit like Django, transactions are opened explicitly.
+    db = sqlite3.connect(path, isolation_level=None)
+    for name, value in pragmas.items():
+        # Journal mode is stored in the file, set once per run.
+        if name != 'journal_mode':
+            db.execute(f'PRAGMA {name} = {value}')
+    return db
+
+
+class Command(BaseCommand):
+    help = ('Compares concurrent reads and writes of a copy of the '
+            'database under the default and the production SQLite '
+            'profile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--write-share',
+            type=float,
+            default=0.2,
+            help='Share of operations that add a comment.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The database is not SQLite.')
+        self.post_ids = list(
+            Post.objects.values_list('pk', flat=True)[:SAMPLE]
+        )
+        self.user_ids = list(
+            User.objects.values_list('pk', flat=True)[:SAMPLE]
+        )
+        if not self.post_ids or not self.user_ids:
+            raise CommandError('No posts to comment, run seed first.')
+        self.read_sql, self.read_params = (
+            Post.objects.select_related('author', 'group')
+            .order_by('-created', '-id')[:11].query.sql_with_params()
+        )
+        production = import_module('yatube.settings_production')
+        # Both profiles keep a connection per thread and retry busy
+        # operations, only the pragmas differ.
+        profiles = {
+            'default': DEFAULT_PRAGMAS,
+            'production': production.SQLITE_PRAGMAS,
+        }
+        self.stdout.write(
+            f'{"profile":<12}{"reads/s":>9}{"writes/s":>10}'
+            f'{"read p95 ms":>13}{"write p95 ms":>14}{"errors":>8}'
+        )
+        for name, pragmas in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'db.sqlite3')
+                self.copy_database(path)
+                stats = self.run(path, pragmas, options)
+            self.stdout.write(
+                f'{name:<12}{stats["reads"]:>9.1f}{stats["writes"]:>10.1f}'
+                f'{stats["read_p95"]:>13.2f}{stats["write_p95"]:>14.2f}'
+                f'{stats["errors"]:>8}'
+            )
+
+    def copy_database(self, path):
+        source = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        target = sqlite3.connect(path)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+
+    def read(self, db):
+        db.execute(self.read_sql, self.read_params).fetchall()
+
+    def write(self, db, rng):
+        post_id = rng.choice(self.post_ids)
+        created = timezone.now().replace(tzinfo=None).isoformat(' ')
+        db.execute('BEGIN')
+        try:
+            db.execute(
+                f'INSERT INTO {Comment._meta.db_table} '
+                '(created, post_id, author_id, text) VALUES (?, ?, ?, ?)',
+                (created, post_id, rng.choice(self.user_ids),
+                 'Benchmark comment'),
+            )
+            db.execute(
+                f'UPDATE {Post._meta.db_table} '
+                'SET comments_count = comments_count + 1 WHERE id = ?',
+                (post_id,),
+            )
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            db.execute('ROLLBACK')
+            raise
+
+    def run(self, path, pragmas, options):
+        db = sqlite3.connect(path)
+        db.execute(f'PRAGMA journal_mode = {pragmas["journal_mode"]}')
+        db.close()
+        self.deadline = time.monotonic() + options['seconds']
+        self.write_share = options['write_share']
+        self.latencies = {'read': [], 'write': []}
+        self.errors = []
+        threads = [threading.Thread(target=self.work, args=(path, pragmas, i))
+                   for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = options['seconds']
+        return {
+            'reads': len(self.latencies['read']) / seconds,
+            'writes': len(self.latencies['write']) / seconds,
+            'read_p95': 1000 * (
+                percentile(sorted(self.latencies['read']), 0.95) or 0
+            ),
+            'write_p95': 1000 * (
+                percentile(sorted(self.latencies['write']), 0.95) or 0
+            ),
+            'errors': len(self.errors),
+        }
+
+    def work(self, path, pragmas, seed):
+        """Runs random operations over one connection until deadline."""
+        rng = random.Random(seed)
+        db = _connect(path, pragmas)
+        try:
+            while time.monotonic() < self.deadline:
+                kind = 'write' if rng.random() < self.write_share else 'read'
+                started = time.perf_counter()
+                try:
+                    self.attempt(db, kind, rng)
+                except sqlite3.OperationalError as error:
+                    self.errors.append(error)
+                else:
+                    self.latencies[kind].append(
+                        time.perf_counter() - started
+                    )
+        finally:
+            db.close()
+
+    def attempt(self, db, kind, rng):
+        """Runs an operation, retried like core.db.retry_on_busy does."""
+        for attempt in range(RETRIES + 1):
+            try:
+                if kind == 'write':
+                    return self.write(db, rng)
+                return self.read(db)
+            except sqlite3.OperationalError as error:
+                if attempt == RETRIES or not is_busy(error):
+                    raise
+            time.sleep(DELAY * 2 ** attempt)
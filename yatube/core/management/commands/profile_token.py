@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = ('Prints a token that makes a request profiled when sent in '
+            'the profiling header.')
+
+    def handle(self, *args, **options):
+        header = settings.PROFILE_HEADER[len('HTTP_'):].replace('_', '-')
+        self.stdout.write(f'{header.title()}: {make_token()}')
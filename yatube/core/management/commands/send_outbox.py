@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import mail
+
+
+class Command(BaseCommand):
+    help = 'Sends emails queued in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the queue once and exit.',
+        )
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when no email is due.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = mail.send_pending(options['batch'])
+            if sent or failed:
+                self.stdout.write(f'Sent: {sent}, failed: {failed}.')
+            if options['once']:
+                return
+            if not sent:
+                time.sleep(options['interval'])
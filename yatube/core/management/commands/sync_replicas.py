@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core import routers
+
+
+class Command(BaseCommand):
+    help = ('Copies the default SQLite database into the file of every '
+            'replica alias. Run it at least every REPLICA_MAX_LAG '
+            'seconds, stale replicas are not read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Repeat every given seconds instead of copying once.',
+        )
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]:
+            if not databases[alias]['ENGINE'].endswith('sqlite3'):
+                raise CommandError(f'Database {alias} is not SQLite.')
+        interval = options['interval']
+        if interval is not None and interval >= settings.REPLICA_MAX_LAG:
+            raise CommandError('Interval must be shorter than '
+                               'REPLICA_MAX_LAG.')
+        while True:
+            started = time.monotonic()
+            for alias in settings.DATABASE_REPLICAS:
+                point = routers.current_point()
+                self.copy(databases[DEFAULT_DB_ALIAS]['NAME'],
+                          databases[alias]['NAME'])
+                # Readers of the old copy may have cached newer data
+                # under the old point, never older data under this one.
+                routers.mark_synced(alias, point)
+            self.stdout.write(
+                f'Replicas synced in {time.monotonic() - started:.2f}s.'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def copy(self, source_name, target_name):
+        # Online backup copies a consistent snapshot in place, so open
+        # replica connections see the new data.
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(target_name)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import benchmark, warmup
+
+MODES = ('cold', 'warm')
+# Every probe starts with empty caches of its own, so only the state
+# of the process differs between cold and warm runs.
+PROBE_CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.MeteredLocMemCache',
+        'LOCATION': 'warmup-probe',
+    }
+}
+
+
+class Command(BaseCommand):
+    help = ('Compares latency of first requests to WARMUP_VIEWS in fresh '
+            'processes started cold and warmed up by core.warmup.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Fresh processes per mode, medians are reported.',
+        )
+        parser.add_argument('--probe', choices=MODES, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['probe']:
+            with override_settings(CACHES=PROBE_CACHES, PAGE_CACHE_TIMEOUT=0):
+                results = self.probe(options['probe'] == 'warm')
+            self.stdout.write(json.dumps(results))
+            return
+        runs = {mode: [] for mode in MODES}
+        for _ in range(options['runs']):
+            for mode in MODES:
+                runs[mode].append(self.spawn(mode))
+        self.report(runs)
+
+    def spawn(self, mode):
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        process = subprocess.run(
+            [sys.executable, manage, 'warmup', '--probe', mode],
+            capture_output=True, text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr)
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def probe(self, warm):
+        # The plain handler, yatube.wsgi would warm up on its own.
+        application = get_wsgi_application()
+        timings = warmup.run(application) if warm else {}
+        cache.clear()
+        latencies = {}
+        for view_name in settings.WARMUP_VIEWS:
+            path = reverse(view_name)
+            started = time.perf_counter()
+            status, _ = benchmark.call(application, 'GET', path)
+            latencies[view_name] = time.perf_counter() - started
+            if status >= 500:
+                raise CommandError(f'{path} answered {status}.')
+        return {'warmup': timings, 'latencies': latencies}
+
+    def report(self, runs):
+        self.stdout.write(f'{"view":<16}{"cold ms":>10}{"warm ms":>10}')
+        for view_name in settings.WARMUP_VIEWS:
+            cold, warm = (
+                1000 * statistics.median(run['latencies'][view_name]
+                                         for run in runs[mode])
+                for mode in MODES
+            )
+            self.stdout.write(f'{view_name:<16}{cold:>10.1f}{warm:>10.1f}')
+        steps = [
+            (name, 1000 * statistics.median(run['warmup'][name]
+                                            for run in runs['warm']))
+            for name in runs['warm'][0]['warmup']
+        ]
+        self.stdout.write('warm-up: ' + ', '.join(
+            f'{name} {seconds:.1f} ms' for name, seconds in steps
+        ))
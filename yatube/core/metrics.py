@@ -0,0 +1,234 @@
+"""Counters and histograms exported in Prometheus text format.
+
+Every process keeps its samples in memory and dumps them to
+settings.METRICS_DIR/<pid>.json at most every METRICS_FLUSH_INTERVAL
+seconds, the metrics view sums the files of all processes. Files of
+finished processes are folded into retired.json, so counters never go
+back and a new process reusing a pid starts from zero.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+FAMILIES = {
+    'yatube_requests_total': (
+        'counter', 'Requests by URL name, method and status.'
+    ),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Request latency by URL name.'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'SQL queries by URL name.'
+    ),
+    'yatube_db_query_duration_seconds_total': (
+        'counter', 'Time spent in SQL queries by URL name.'
+    ),
+    'yatube_template_render_duration_seconds': (
+        'histogram', 'Render time of templates.'
+    ),
+    'yatube_cache_requests_total': (
+        'counter',
+        'Lookups of page, fragment and card caches and thumbnail store.',
+    ),
+    'yatube_fragment_lock_waits_total': (
+        'counter', 'Waits for a fragment computed by another worker.'
+    ),
+    'yatube_fragment_lock_wait_seconds': (
+        'histogram', 'Time spent waiting for a fragment.'
+    ),
+    'yatube_fragment_stale_serves_total': (
+        'counter', 'Due fragments served while another worker rebuilds.'
+    ),
+    'yatube_fragment_early_refreshes_total': (
+        'counter', 'Fragments rebuilt before they were due.'
+    ),
+}
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.samples = defaultdict(float)
+        self.flushed = time.monotonic()
+        # A file under our pid was left by a finished process.
+        if settings.METRICS_DIR:
+            self._retire(self.pid)
+
+    def _check_fork(self):
+        # A forked child starts with a copy of parent samples.
+        if self.pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._check_fork()
+            self.samples[key] += amount
+        self.maybe_flush()
+
+    def observe(self, name, labels, value):
+        """Records value in histogram name."""
+        with self.lock:
+            self._check_fork()
+            for bound in (*BUCKETS, '+Inf'):
+                # Empty buckets are stored too, histograms need all.
+                bucket = {**labels, 'le': str(bound)}
+                key = (f'{name}_bucket', tuple(sorted(bucket.items())))
+                self.samples[key] += bound == '+Inf' or value <= bound
+            labels = tuple(sorted(labels.items()))
+            self.samples[(f'{name}_sum', labels)] += value
+            self.samples[(f'{name}_count', labels)] += 1
+        self.maybe_flush()
+
+    def _path(self, pid):
+        return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+    def _retire(self, pid):
+        """Adds samples of finished process pid to the retired totals."""
+        path = self._path(pid)
+        claimed = f'{path}.retiring'
+        try:
+            # Only one process wins the rename, samples are added once.
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return
+        retired = self._path('retired')
+        with open(f'{retired}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            totals = _read(retired)
+            for key, value in _read(claimed).items():
+                totals[key] += value
+            _write(retired, totals)
+            os.remove(claimed)
+
+    def maybe_flush(self):
+        if (settings.METRICS_DIR and time.monotonic() - self.flushed
+                >= settings.METRICS_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        if not settings.METRICS_DIR:
+            return
+        with self.lock:
+            self._check_fork()
+            self.flushed = time.monotonic()
+            samples = dict(self.samples)
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _write(self._path(self.pid), samples)
+
+    def collect(self):
+        """Sums samples of this process and files of other processes."""
+        totals = defaultdict(float)
+        directory = settings.METRICS_DIR
+        names = os.listdir(directory) if directory and os.path.isdir(
+            directory
+        ) else []
+        for name in names:
+            pid = name[:-len('.json')]
+            if (name.endswith('.json') and pid.isdigit()
+                    and int(pid) != os.getpid() and not _alive(int(pid))):
+                self._retire(pid)
+        names = os.listdir(directory) if names else []
+        for name in names:
+            if not name.endswith('.json') or name == f'{os.getpid()}.json':
+                continue
+            for key, value in _read(os.path.join(directory, name)).items():
+                totals[key] += value
+        with self.lock:
+            self._check_fork()
+            for key, value in self.samples.items():
+                totals[key] += value
+        return totals
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read(path):
+    """Returns samples stored in path, none if it is missing or broken."""
+    samples = defaultdict(float)
+    try:
+        with open(path, encoding='utf-8') as file:
+            rows = json.load(file)
+    except (OSError, ValueError):
+        return samples
+    for sample, labels, value in rows:
+        samples[(sample, tuple(map(tuple, labels)))] += value
+    return samples
+
+
+def _write(path, samples):
+    rows = [[name, labels, value]
+            for (name, labels), value in samples.items()]
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as file:
+        json.dump(rows, file)
+    os.replace(f'{path}.tmp', path)
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+atexit.register(REGISTRY.flush)
+
+
+def _family(sample):
+    for suffix in ('_bucket', '_sum', '_count'):
+        family = sample[:-len(suffix)]
+        if sample.endswith(suffix) and family in FAMILIES:
+            return family
+    return sample
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+    return f'{{{pairs}}}'
+
+
+def _bucket_order(item):
+    (sample, labels), _ = item
+    labels = dict(labels)
+    bound = labels.pop('le', None)
+    bound = float('inf') if bound == '+Inf' else float(bound or 0)
+    return sample, sorted(labels.items()), bound
+
+
+def render():
+    """Returns all samples in Prometheus text exposition format."""
+    families = defaultdict(list)
+    for item in REGISTRY.collect().items():
+        families[_family(item[0][0])].append(item)
+    lines = []
+    for family in sorted(families):
+        kind, description = FAMILIES.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for (sample, labels), value in sorted(families[family],
+                                              key=_bucket_order):
+            value = int(value) if value.is_integer() else value
+            lines.append(f'{sample}{_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,149 @@
+import logging
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+from . import metrics, profiling, routers
+from .budgets import QueryBudgetExceeded, count_queries, get_budget
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """Counts requests, their latency and SQL queries per URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with count_queries() as queries:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = {'view': match.view_name if match else 'unresolved'}
+        metrics.inc('yatube_requests_total',
+                    {**view,
+                     'method': request.method,
+                     'status': str(response.status_code)})
+        metrics.observe('yatube_request_duration_seconds', view, elapsed)
+        metrics.inc('yatube_db_queries_total', view, queries.count)
+        metrics.inc('yatube_db_query_duration_seconds_total',
+                    view, queries.seconds)
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Logs or rejects requests making more queries than budgeted.
+
+    Turned on by settings.QUERY_BUDGET_ACTION, 'log' or 'reject'.
+    """
+
+    def __init__(self, get_response):
+        self.action = settings.QUERY_BUDGET_ACTION
+        if not self.action:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as queries:
+            response = self.get_response(request)
+        match = request.resolver_match
+        budget = match and get_budget(match.view_name)
+        if budget is not None and queries.count > budget:
+            message = (f'{match.view_name} made {queries.count} queries, '
+                       f'budget is {budget}: {request.get_full_path()}')
+            if self.action == 'reject':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class ProfilingMiddleware:
+    """Profiles a PROFILE_RATE share of requests and signed requests.
+
+    A request is signed when PROFILE_HEADER holds a token made by the
+    profile_token command, its response names the written file.
+    """
+
+    def __init__(self, get_response):
+        self.rate = settings.PROFILE_RATE
+        self.header = settings.PROFILE_HEADER
+        if not self.rate and not self.header:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        signed = self.header and profiling.is_signed(
+            request.META.get(self.header)
+        )
+        if not signed and random.random() >= self.rate:
+            return self.get_response(request)
+        profiler = profiling.get_profiler()
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        match = request.resolver_match
+        path = profiling.save(profiler,
+                              match.view_name if match else 'unresolved')
+        if signed:
+            response['X-Profile'] = os.path.relpath(path,
+                                                    settings.PROFILE_DIR)
+        return response
+
+
+class ReplicaMiddleware:
+    """Lets REPLICA_VIEWS read from replicas synced after client writes.
+
+    The time of the last write of a client is kept in a signed cookie set
+    after any of its requests wrote to the database.
+    """
+
+    cookie = 'pin_primary'
+    salt = 'core.routers'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        if settings.REPLICA_PIN_SECONDS < settings.REPLICA_MAX_LAG:
+            # A forgotten write could be newer than a replica in use.
+            raise ImproperlyConfigured('REPLICA_PIN_SECONDS must not be '
+                                       'shorter than REPLICA_MAX_LAG.')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        written = request.get_signed_cookie(
+            self.cookie,
+            default=None,
+            salt=self.salt,
+            max_age=settings.REPLICA_PIN_SECONDS,
+        )
+        request.written_at = written and int(written)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.wrote()
+            routers.reset()
+        if wrote:
+            # The request is over, so its writes are committed by now.
+            response.set_signed_cookie(
+                self.cookie,
+                str(routers.current_point()),
+                salt=self.salt,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name
+                in settings.REPLICA_VIEWS):
+            routers.read_from_replicas(since=request.written_at)
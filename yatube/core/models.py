@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class CreateModel(models.Model):
@@ -10,3 +11,34 @@ class CreateModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Outbox(CreateModel):
+    """Email waiting to be sent by the send_outbox command."""
+
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    html_body = models.TextField('HTML текст', blank=True)
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField(
+        'Получатели',
+        help_text='По одному адресу в строке',
+    )
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    next_attempt = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ('next_attempt',)
+        indexes = [
+            models.Index(fields=['next_attempt'],
+                         name='outbox_next_attempt_idx'),
+        ]
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self) -> str:
+        return self.subject
@@ -0,0 +1,38 @@
+"""Whole responses to anonymous users cached under page validators.
+
+A page is stored under its ETag, made of the path with query string and
+the versions of the scopes the page shows. A write bumping any of those
+versions changes the ETag, so the old entry is never served again and
+simply expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'page:'
+
+
+def _key(etag):
+    return f'{KEY_PREFIX}{etag}'
+
+
+def is_cacheable(request):
+    return (bool(settings.PAGE_CACHE_TIMEOUT)
+            and request.method in ('GET', 'HEAD')
+            and not request.user.is_authenticated)
+
+
+def get(etag):
+    """Returns the response stored under etag or None."""
+    return cache.get(_key(etag))
+
+
+def set(request, etag, response):
+    """Stores response unless it is personal or not a complete page."""
+    if (response.status_code != 200
+            or response.streaming
+            or response.cookies
+            # A page with a CSRF token must not be shared between users.
+            or request.META.get('CSRF_COOKIE_USED')
+            or 'private' in response.get('Cache-Control', '')):
+        return
+    cache.set(_key(etag), response, settings.PAGE_CACHE_TIMEOUT)
@@ -0,0 +1,140 @@
+"""Profiles of single requests stored per URL name.
+
+Profiles go to settings.PROFILE_DIR/<url name>/ as cProfile dumps
+(.prof, for pstats or snakeviz) or as collapsed stacks of a sampler
+(.collapsed, for flamegraph.pl or speedscope). Only PROFILE_KEEP newest
+files of a URL name and PROFILE_MAX_BYTES in total are kept.
+"""
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+
+
+def make_token():
+    """Returns a value of PROFILE_HEADER that asks to profile."""
+    return signing.dumps('profile', salt=SALT)
+
+
+def is_signed(token):
+    if not token:
+        return False
+    try:
+        signing.loads(token, salt=SALT,
+                      max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class CProfiler:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}.{code.co_name}:{frame.f_lineno}'.replace(';', ',')
+
+
+class StackSampler:
+    """Counts stacks of the calling thread taken every interval."""
+
+    extension = 'collapsed'
+
+    def __init__(self, interval=None):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.ident)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.ident = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+PROFILERS = {'cprofile': CProfiler, 'sample': StackSampler}
+
+
+def get_profiler():
+    return PROFILERS[settings.PROFILE_MODE]()
+
+
+def _files(directory):
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, path
+
+
+def _remove(path):
+    # Another process may rotate the same files concurrently.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def rotate(directory):
+    """Removes oldest profiles over PROFILE_KEEP or PROFILE_MAX_BYTES."""
+    view_files = sorted(_files(directory), reverse=True)
+    for _, _, path in view_files[settings.PROFILE_KEEP:]:
+        _remove(path)
+    total = 0
+    for _, size, path in sorted(_files(settings.PROFILE_DIR), reverse=True):
+        total += size
+        if total > settings.PROFILE_MAX_BYTES:
+            _remove(path)
+
+
+def save(profiler, view_name):
+    """Writes profiler results for view_name, returns their path."""
+    directory = os.path.join(settings.PROFILE_DIR,
+                             view_name.replace(':', '.'))
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.time():.6f}-{os.getpid()}.{profiler.extension}'
+    path = os.path.join(directory, name)
+    profiler.dump(path)
+    rotate(directory)
+    return path
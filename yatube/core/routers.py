@@ -0,0 +1,109 @@
+"""Routes reads of listed views to replicas, everything else to default.
+
+ReplicaMiddleware turns replicas on for the request. Any write marks the
+request, so the rest of it reads from default, and the middleware keeps
+the time of the write for REPLICA_PIN_SECONDS, so later requests of the
+client only read replicas synced after it and the user sees their own
+changes while replicas catch up.
+
+Only replicas whose sync point is within REPLICA_MAX_LAG are used, so a
+missing or stalled copy is never read. As REPLICA_PIN_SECONDS is not
+shorter, every replica in use is synced after any write the client has
+forgotten. The sync point goes into cache versions of the request (see
+core.cache), so data read from a lagging copy is never cached under
+versions bumped since.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+SYNCED_PREFIX = 'replica:synced:'
+
+_state = threading.local()
+
+
+def _synced_key(alias):
+    return f'{SYNCED_PREFIX}{alias}'
+
+
+def reset():
+    _state.replica = None
+    _state.sync_point = None
+    _state.wrote = False
+
+
+def current_point():
+    """Returns the current time in milliseconds, the unit of sync points."""
+    return int(time.time() * 1000)
+
+
+def mark_synced(alias, point):
+    """Records that alias holds the data of default as of point.
+
+    The record expires REPLICA_MAX_LAG after point, not after the copy.
+    """
+    timeout = settings.REPLICA_MAX_LAG - (current_point() - point) / 1000
+    if timeout > 0:
+        cache.set(_synced_key(alias), point, timeout)
+    else:
+        cache.delete(_synced_key(alias))
+
+
+def read_from_replicas(since=None):
+    """Sends reads of this request to a replica synced lately, if any.
+
+    Replicas synced at or before the point since are skipped.
+    """
+    points = cache.get_many(map(_synced_key, settings.DATABASE_REPLICAS))
+    keys = sorted(key for key, point in points.items()
+                  if since is None or point > since)
+    if keys:
+        key = random.choice(keys)
+        _state.replica = key[len(SYNCED_PREFIX):]
+        _state.sync_point = points[key]
+
+
+@contextmanager
+def primary():
+    """Sends reads made inside the block to default."""
+    replica = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = replica
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def sync_point():
+    """Returns the sync point of the replica reads go to, or None."""
+    if wrote():
+        return None
+    return getattr(_state, 'sync_point', None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica and not wrote():
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of default made by sync_replicas.
+        return db not in settings.DATABASE_REPLICAS
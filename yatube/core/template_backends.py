@@ -0,0 +1,30 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from . import metrics
+
+
+class Template(django.Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.observe('yatube_template_render_duration_seconds',
+                            {'template': self.origin.template_name},
+                            time.perf_counter() - started)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """Django engine timing every rendered template."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
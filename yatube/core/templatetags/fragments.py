@@ -0,0 +1,59 @@
+"""Drop-in {% cache %} tag that rebuilds a fragment in one worker only.
+
+Load it instead of the built-in library, arguments are the same:
+{% load fragments %}{% cache timeout name vary_on... %}...{% endcache %}
+"""
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+from core import fragments
+
+register = template.Library()
+
+
+class FragmentNode(CacheNode):
+    def _resolve(self, value, context):
+        try:
+            return value.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: {value.var!r}'
+            )
+
+    def render(self, context):
+        timeout = self._resolve(self.expire_time_var, context)
+        if timeout is not None:
+            try:
+                timeout = int(timeout)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"cache" tag got a non-integer timeout value: '
+                    f'{timeout!r}'
+                )
+        cache_name = (self._resolve(self.cache_name, context)
+                      if self.cache_name else 'template_fragments')
+        try:
+            fragment_cache = caches[cache_name]
+        except InvalidCacheBackendError:
+            if self.cache_name:
+                raise template.TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: '
+                    f'{cache_name!r}'
+                )
+            fragment_cache = caches['default']
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        return fragments.get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            timeout,
+            fragment_cache,
+        )
+
+
+@register.tag('cache')
+def do_fragment_cache(parser, token):
+    node = do_cache(parser, token)
+    return FragmentNode(node.nodelist, node.expire_time_var,
+                        node.fragment_name, node.vary_on, node.cache_name)
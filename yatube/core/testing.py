@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .budgets import get_budget
+
+
+class QueryBudgetMixin:
+    """Checks TestCase requests against settings.QUERY_BUDGETS."""
+
+    def assertWithinBudget(self, view_name, args=None, data=None,
+                           method='get', client=None):
+        budget = get_budget(view_name)
+        self.assertIsNotNone(budget, f'{view_name} has no query budget')
+        request = getattr(client or self.client, method)
+        with CaptureQueriesContext(connection) as queries:
+            response = request(reverse(view_name, args=args), data)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            '\n'.join([f'{view_name} is over budget {budget}:',
+                       *(query['sql'] for query in queries)])
+        )
+        return response
+
+
+@contextmanager
+def run_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Runs on_commit callbacks registered inside the block at its end.
+
+    TestCase never commits, so they would never run otherwise.
+    """
+    callbacks = connections[using].run_on_commit
+    start = len(callbacks)
+    yield
+    pending = callbacks[start:]
+    del callbacks[start:]
+    for _, callback in pending:
+        callback()
@@ -1,8 +1,45 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 from http import HTTPStatus
+from smtplib import SMTPException
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail as django_mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory
+from django.urls import resolve
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
 
-from .models import CreateModel
+from . import (benchmark, db, fragments, mail, metrics, page_cache,
+               profiling, routers, warmup)
+from .cache_backends import SQLiteCache
+from .budgets import QueryBudgetExceeded
+from .cache import get_versions
+from .middleware import ReplicaMiddleware
+from .models import CreateModel, Outbox
+from .routers import ReplicaRouter
+
+User = get_user_model()
 
 
 class ModelsTest(TestCase):
@@ -19,3 +56,579 @@ class ViewsTest(TestCase):
         response = self.client.get('/unexcepting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(QUERY_BUDGETS={'posts:index': 0}, PAGE_CACHE_TIMEOUT=0)
+class QueryBudgetMiddlewareTest(TestCase):
+    @override_settings(QUERY_BUDGET_ACTION='log')
+    def test_over_budget_request_is_logged(self):
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('posts:index made', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_ACTION='reject')
+    def test_over_budget_request_is_rejected(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/')
+
+    @override_settings(QUERY_BUDGET_ACTION='reject')
+    def test_request_without_budget_passes(self):
+        response = self.client.get('/about/author/')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+TEMP_PROFILE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PROFILE_DIR=TEMP_PROFILE_DIR, PROFILE_RATE=0)
+class ProfilingMiddlewareTest(TestCase):
+    def tearDown(self):
+        shutil.rmtree(TEMP_PROFILE_DIR, ignore_errors=True)
+
+    def _profiles(self, view_name):
+        directory = os.path.join(TEMP_PROFILE_DIR, view_name)
+        return sorted(os.listdir(directory)) if os.path.isdir(
+            directory
+        ) else []
+
+    def test_unsigned_request_is_not_profiled(self):
+        self.client.get('/', HTTP_X_PROFILE='forged')
+        self.assertEqual(self._profiles('posts.index'), [])
+
+    @override_settings(PROFILE_MODE='cprofile')
+    def test_signed_request_writes_cprofile_dump(self):
+        response = self.client.get('/',
+                                   HTTP_X_PROFILE=profiling.make_token())
+        profiles = self._profiles('posts.index')
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('.prof'))
+        self.assertEqual(response['X-Profile'],
+                         os.path.join('posts.index', profiles[0]))
+
+    @override_settings(PROFILE_RATE=1, PROFILE_SAMPLE_INTERVAL=0.0001)
+    def test_sampled_request_writes_collapsed_stacks(self):
+        def slow_versions(*names):
+            # Leaves the sampler time for a few stacks.
+            time.sleep(0.02)
+            return get_versions(*names)
+
+        # A page served from the page cache never reaches the view.
+        cache.clear()
+        with mock.patch('posts.views.get_versions', slow_versions):
+            self.client.get('/')
+        profiles = self._profiles('posts.index')
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].endswith('.collapsed'))
+        with open(os.path.join(TEMP_PROFILE_DIR, 'posts.index',
+                               profiles[0]), encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertIn('core.middleware.__call__', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_sampler_collects_stacks_of_calling_thread(self):
+        sampler = profiling.StackSampler(interval=0.001)
+        sampler.start()
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            pass
+        sampler.stop()
+        path = os.path.join(TEMP_PROFILE_DIR, 'stacks.collapsed')
+        os.makedirs(TEMP_PROFILE_DIR, exist_ok=True)
+        sampler.dump(path)
+        with open(path, encoding='utf-8') as file:
+            stack, count = file.readline().rsplit(' ', 1)
+        self.assertIn(
+            'core.tests.test_sampler_collects_stacks_of_calling_thread',
+            stack
+        )
+        self.assertGreater(int(count), 0)
+
+    @override_settings(PROFILE_RATE=1, PROFILE_KEEP=2)
+    def test_rotation_keeps_newest_profiles(self):
+        for _ in range(4):
+            self.client.get('/')
+        self.assertEqual(len(self._profiles('posts.index')), 2)
+
+    @override_settings(PROFILE_RATE=1, PROFILE_MODE='cprofile',
+                       PROFILE_MAX_BYTES=0)
+    def test_rotation_caps_disk_use(self):
+        self.client.get('/')
+        self.assertEqual(self._profiles('posts.index'), [])
+
+
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        # Pages of anonymous users must be rendered, not served whole.
+        cache.clear()
+
+    def _value(self, sample):
+        """Returns current value of sample line, 0 if it is missing."""
+        response = self.client.get('/metrics')
+        for line in response.content.decode().splitlines():
+            if line.startswith(f'{sample} '):
+                return float(line.rsplit(' ', 1)[1])
+        return 0
+
+    def test_requests_queries_and_templates_are_counted(self):
+        view = 'view="posts:index"'
+        samples = [
+            f'yatube_requests_total{{method="GET",status="200",{view}}}',
+            f'yatube_request_duration_seconds_bucket{{le="+Inf",{view}}}',
+            f'yatube_db_queries_total{{{view}}}',
+            'yatube_template_render_duration_seconds_count'
+            '{template="posts/index.html"}',
+        ]
+        before = [self._value(sample) for sample in samples]
+        self.client.get('/')
+        after = [self._value(sample) for sample in samples]
+        self.assertEqual(after[0] - before[0], 1)
+        self.assertEqual(after[1] - before[1], 1)
+        self.assertGreater(after[2], before[2])
+        self.assertEqual(after[3] - before[3], 1)
+
+    def test_caches_and_thumbnail_store_are_counted(self):
+        page_hit = 'yatube_cache_requests_total{cache="pages",result="hit"}'
+        hit = 'yatube_cache_requests_total{cache="fragments",result="hit"}'
+        miss = ('yatube_cache_requests_total'
+                '{cache="thumbnails",result="miss"}')
+        self.client.get('/')
+        page_hits = self._value(page_hit)
+        self.client.get('/')
+        self.assertEqual(self._value(page_hit) - page_hits, 1)
+        self.client.force_login(User.objects.create_user(username='user'))
+        self.client.get('/')
+        hits = self._value(hit)
+        self.client.get('/')
+        self.assertGreater(self._value(hit), hits)
+        misses = self._value(miss)
+        default.kvstore.get(ImageFile('missing.jpg'))
+        self.assertEqual(self._value(miss) - misses, 1)
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_samples_of_other_processes_are_summed(self):
+        sample = 'yatube_db_queries_total{view="other"}'
+        os.makedirs(TEMP_METRICS_DIR, exist_ok=True)
+        self.addCleanup(shutil.rmtree, TEMP_METRICS_DIR, True)
+        with open(os.path.join(TEMP_METRICS_DIR, '0.json'), 'w') as file:
+            json.dump([['yatube_db_queries_total', [['view', 'other']], 3]],
+                      file)
+        before = self._value(sample)
+        metrics.inc('yatube_db_queries_total', {'view': 'other'}, 2)
+        # Own file is skipped in favour of samples in memory.
+        metrics.REGISTRY.flush()
+        self.assertEqual(self._value(sample), before + 2)
+        self.assertGreaterEqual(before, 3)
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_files_of_finished_processes_are_retired(self):
+        sample = 'yatube_db_queries_total{view="finished"}'
+        os.makedirs(TEMP_METRICS_DIR, exist_ok=True)
+        self.addCleanup(shutil.rmtree, TEMP_METRICS_DIR, True)
+        finished = subprocess.Popen(['true'])
+        finished.wait()
+        rows = [['yatube_db_queries_total', [['view', 'finished']], 3]]
+        for name in (f'{finished.pid}.json', 'retired.json'):
+            with open(os.path.join(TEMP_METRICS_DIR, name), 'w') as file:
+                json.dump(rows, file)
+        self.assertEqual(self._value(sample), 6)
+        self.assertEqual(os.listdir(TEMP_METRICS_DIR).count('retired.json'),
+                         1)
+        self.assertNotIn(f'{finished.pid}.json', os.listdir(TEMP_METRICS_DIR))
+        self.assertEqual(self._value(sample), 6)
+
+    def test_metered_get_many_counts_every_key_once(self):
+        miss = 'yatube_cache_requests_total{cache="cards",result="miss"}'
+        misses = self._value(miss)
+        cache.get_many(['card:1', 'card:2'])
+        self.assertEqual(self._value(miss) - misses, 2)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_are_hidden_from_other_addresses(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class BrokenBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('Service not available')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError
+
+
+class OutboxTest(TestCase):
+    def test_due_emails_are_sent_and_removed(self):
+        for i in range(3):
+            mail.enqueue(f'Subject {i}', 'Body', [f'user{i}@yandex.com'])
+        mail.enqueue('Later', 'Body', ['user@yandex.com'])
+        Outbox.objects.filter(subject='Later').update(
+            next_attempt=timezone.now() + timedelta(hours=1)
+        )
+        self.assertEqual(mail.send_pending(limit=2), (2, 0))
+        self.assertEqual(mail.send_pending(), (1, 0))
+        self.assertEqual(len(django_mail.outbox), 3)
+        self.assertEqual(
+            list(Outbox.objects.values_list('subject', flat=True)),
+            ['Later']
+        )
+
+    @override_settings(EMAIL_BACKEND='core.tests.BrokenBackend')
+    def test_failed_email_is_retried_with_backoff(self):
+        entry = mail.enqueue('Subject', 'Body', ['user@yandex.com'])
+        self.assertEqual(mail.send_pending(), (0, 1))
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 1)
+        self.assertIn('Service not available', entry.error)
+        self.assertGreater(entry.next_attempt, timezone.now())
+        self.assertEqual(mail.send_pending(), (0, 0))
+        first_delay = entry.next_attempt - timezone.now()
+        Outbox.objects.update(next_attempt=timezone.now())
+        mail.send_pending()
+        entry.refresh_from_db()
+        self.assertGreater(entry.next_attempt - timezone.now(),
+                           first_delay)
+
+    @override_settings(EMAIL_BACKEND='core.tests.UnreachableBackend')
+    def test_batch_is_postponed_when_server_is_unreachable(self):
+        entry = mail.enqueue('Subject', 'Body', ['user@yandex.com'])
+        Outbox.objects.update(attempts=mail.MAX_ATTEMPTS - 1)
+        self.assertEqual(mail.send_pending(), (0, 1))
+        self.assertEqual(mail.send_pending(), (0, 0))
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, mail.MAX_ATTEMPTS - 1)
+        self.assertIn('ConnectionRefusedError', entry.error)
+        Outbox.objects.update(next_attempt=timezone.now())
+        self.assertEqual(mail.send_pending(), (0, 1))
+
+
+class SQLiteTest(TestCase):
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas_are_applied_to_connection(self):
+        db.apply_pragmas(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+    def test_busy_write_view_is_retried(self):
+        calls = []
+
+        @db.retry_on_busy
+        def view(request):
+            calls.append(connection.in_atomic_block)
+            if len(calls) < 2:
+                raise OperationalError('database is locked')
+            return HttpResponse()
+
+        response = view(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(calls, [True, True])
+
+    def test_other_errors_are_not_retried(self):
+        calls = []
+
+        @db.retry_on_busy
+        def view(request):
+            calls.append(request)
+            raise OperationalError('no such table: missing')
+
+        with self.assertRaises(OperationalError):
+            view(RequestFactory().post('/'))
+        self.assertEqual(len(calls), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.point = routers.current_point()
+        routers.mark_synced('replica', self.point)
+
+    def _route(self, path, method='get', write=False, cookies=None):
+        """Returns database of reads made by the view of path."""
+        router = ReplicaRouter()
+        reads = []
+
+        def get_response(request):
+            request.resolver_match = resolve(request.path_info)
+            middleware.process_view(request, None, (), {})
+            reads.append(router.db_for_read(Outbox))
+            self.versions = get_versions('posts')
+            if write:
+                router.db_for_write(Outbox)
+                reads.append(router.db_for_read(Outbox))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        response = middleware(request)
+        return reads, response
+
+    def test_listed_views_read_from_replica(self):
+        reads, _ = self._route('/')
+        self.assertEqual(reads, ['replica'])
+        reads, _ = self._route('/search/')
+        self.assertEqual(reads, ['default'])
+        reads, _ = self._route('/', method='post')
+        self.assertEqual(reads, ['default'])
+
+    def test_writer_reads_replicas_synced_after_write(self):
+        reads, response = self._route('/', write=True)
+        self.assertEqual(reads, ['replica', 'default'])
+        cookie = response.cookies[ReplicaMiddleware.cookie]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+        cookies = {cookie.key: cookie.value}
+        reads, response = self._route('/', cookies=cookies)
+        self.assertEqual(reads, ['default'])
+        self.assertNotIn(ReplicaMiddleware.cookie, response.cookies)
+        routers.mark_synced('replica', routers.current_point() + 1)
+        reads, _ = self._route('/', cookies=cookies)
+        self.assertEqual(reads, ['replica'])
+
+    @override_settings(REPLICA_PIN_SECONDS=30)
+    def test_pin_shorter_than_lag_is_refused(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaMiddleware(HttpResponse)
+
+    def test_forged_pin_is_ignored(self):
+        reads, _ = self._route(
+            '/', cookies={ReplicaMiddleware.cookie: 'forged'}
+        )
+        self.assertEqual(reads, ['replica'])
+
+    def test_replica_not_synced_lately_is_not_read(self):
+        lag = settings.REPLICA_MAX_LAG * 1000
+        routers.mark_synced('replica', routers.current_point() - lag)
+        reads, _ = self._route('/')
+        self.assertEqual(reads, ['default'])
+
+    def test_versions_of_replica_reads_carry_sync_point(self):
+        self._route('/')
+        self.assertEqual(self.versions,
+                         f'{get_versions("posts")}@{self.point}')
+        self._route('/search/')
+        self.assertEqual(self.versions, get_versions('posts'))
+
+
+def _incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def test_complete_public_page_is_stored(self):
+        self.assertTrue(page_cache.is_cacheable(self.request))
+        page_cache.set(self.request, 'etag', HttpResponse('Page'))
+        self.assertEqual(page_cache.get('etag').content, b'Page')
+
+    def test_personal_pages_are_skipped(self):
+        with_cookie = HttpResponse()
+        with_cookie.set_cookie('name', 'value')
+        for response in (HttpResponse(status=HTTPStatus.NOT_FOUND),
+                         with_cookie):
+            page_cache.set(self.request, 'etag', response)
+        self.request.META['CSRF_COOKIE_USED'] = True
+        page_cache.set(self.request, 'etag', HttpResponse())
+        self.assertIsNone(page_cache.get('etag'))
+
+    def test_only_anonymous_reads_are_cacheable(self):
+        self.request.user = User(username='user')
+        self.assertFalse(page_cache.is_cacheable(self.request))
+        request = RequestFactory().post('/')
+        request.user = AnonymousUser()
+        self.assertFalse(page_cache.is_cacheable(request))
+
+
+class FragmentsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _value(self, sample):
+        for line in metrics.render().splitlines():
+            if line.startswith(f'{sample} '):
+                return float(line.rsplit(' ', 1)[1])
+        return 0
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'fragment'
+
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                fragments.get_or_set('key', compute, 60)
+            ))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['fragment'] * 8)
+        self.assertGreaterEqual(
+            self._value('yatube_fragment_lock_waits_total'
+                        '{result="filled"}'), 7
+        )
+
+    def test_waiter_counts_one_lookup(self):
+        key = 'template.cache.key'
+        miss = 'yatube_cache_requests_total{cache="fragments",result="miss"}'
+        cache.add(fragments._lock_key(key), 1)
+        holder = threading.Timer(0.2, cache.set,
+                                 (key, ('fragment', time.time() + 60, 0.2)))
+        misses = self._value(miss)
+        holder.start()
+        self.assertEqual(fragments.get_or_set(key, lambda: 'own', 60),
+                         'fragment')
+        holder.join()
+        self.assertEqual(self._value(miss) - misses, 1)
+
+    def test_due_entry_is_stale_while_locked(self):
+        sample = 'yatube_fragment_stale_serves_total'
+        cache.set('key', ('old', time.time() - 1, 0.01), 60)
+        cache.add(fragments._lock_key('key'), 1)
+        stale = self._value(sample)
+        self.assertEqual(fragments.get_or_set('key', lambda: 'new', 60), 'old')
+        self.assertEqual(self._value(sample) - stale, 1)
+        cache.delete(fragments._lock_key('key'))
+        self.assertEqual(fragments.get_or_set('key', lambda: 'new', 60), 'new')
+        self.assertEqual(fragments.get_or_set('key', lambda: 'newer', 60),
+                         'new')
+
+    def test_slow_entry_is_refreshed_early(self):
+        cache.set('key', ('old', time.time() + 1, 10), 60)
+        with mock.patch('core.fragments.random.random', return_value=0.5):
+            self.assertEqual(fragments.get_or_set('key', lambda: 'new', 60),
+                             'new')
+        cache.set('key', ('old', time.time() + 1, 0.001), 60)
+        with mock.patch('core.fragments.random.random', return_value=0.5):
+            self.assertEqual(fragments.get_or_set('key', lambda: 'new', 60),
+                             'old')
+
+    def test_template_tag_replaces_builtin_cache(self):
+        fragment = Template(
+            '{% load fragments %}'
+            '{% cache 60 name part %}{{ text }}{% endcache %}'
+        )
+        self.assertEqual(fragment.render(Context({'part': 1, 'text': 'A'})),
+                         'A')
+        self.assertEqual(fragment.render(Context({'part': 1, 'text': 'B'})),
+                         'A')
+        self.assertEqual(fragment.render(Context({'part': 2, 'text': 'B'})),
+                         'B')
+
+
+class WarmupTest(TestCase):
+    def test_all_templates_compile(self):
+        names = [name for _, _, files in os.walk(settings.TEMPLATES_DIR)
+                 for name in files]
+        self.assertEqual(warmup.compile_templates(), len(names))
+
+    def test_warmup_requests_pages(self):
+        warmup.populate_urls()
+        warmup.setup_backends()
+        with self.assertNoLogs('core.warmup', 'WARNING'):
+            warmup.request_pages(get_wsgi_application())
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.location = os.path.join(directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def test_values_round_trip(self):
+        values = {'int': 1, 'bool': True, 'text': 'Текст', 'list': [1, 'a']}
+        self.cache.set_many(values)
+        self.assertEqual(self.cache.get_many([*values, 'missing']), values)
+        self.assertIs(self.cache.get('bool'), True)
+        self.cache.delete_many(['int', 'text'])
+        self.assertIsNone(self.cache.get('int'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('list'))
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 'value', timeout=-1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+        self.assertTrue(self.cache.touch('key', timeout=-1))
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_incr_and_decr(self):
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0, timeout=None)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_incr_many,
+                                   args=(self.location, 100))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_BYTES': 10 * 1024, 'ACCESS_RESOLUTION': 0},
+        })
+        cache.set('hot', 'x' * 1000)
+        for i in range(30):
+            cache.set(f'cold{i}', 'x' * 1000)
+            cache.get('hot')
+        self.assertEqual(cache.get('hot'), 'x' * 1000)
+        self.assertIsNone(cache.get('cold0'))
+        self.assertIsNotNone(cache.get('cold29'))
+        with sqlite3.connect(self.location) as connection:
+            size = connection.execute(
+                'SELECT bytes FROM cache_size'
+            ).fetchone()[0]
+            self.assertLessEqual(size, 10 * 1024)
+            self.assertEqual(size, connection.execute(
+                'SELECT SUM(size) FROM cache'
+            ).fetchone()[0])
+
+
+class BenchmarkTest(TestCase):
+    def test_cache_counter_counts_every_key_once(self):
+        cache.set('present', 1)
+        with benchmark.CacheCounter() as counter:
+            cache.get('present')
+            cache.get_many(['present', 'missing'])
+        self.assertEqual((counter.hits, counter.misses), (2, 1))
+
+    def test_login_cookies_authenticate_requests(self):
+        user = User.objects.create_user(username='bench')
+        status, _ = benchmark.call(
+            get_wsgi_application(), 'GET', '/follow/',
+            cookies=benchmark.login_cookies(user),
+        )
+        self.assertEqual(status, HTTPStatus.OK)
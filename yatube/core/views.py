@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     return render(
@@ -22,3 +26,12 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=HTTPStatus.FORBIDDEN)
+
+
+def metrics(request):
+    """Expose metrics of all processes to Prometheus."""
+    allowed = settings.METRICS_ALLOWED_IPS
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return HttpResponse(metrics_registry.render(),
+                        content_type='text/plain; version=0.0.4')
@@ -0,0 +1,90 @@
+"""Work done by a worker process before it serves real requests.
+
+A fresh process builds URL resolvers, compiles templates and sets up
+the thumbnail backend lazily, so without a warm-up the first requests
+of every worker pay for all of it. yatube.wsgi runs it on start when
+settings.WARMUP_ON_START is set.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver, reverse
+from sorl.thumbnail import default
+
+from . import benchmark
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates():
+    """Loads every template of engine dirs, returns their number.
+
+    With the cached loader compiled templates stay in memory, other
+    loaders only get their files read once.
+    """
+    count = 0
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        for directory in engine.dirs if engine else ():
+            for root, _, files in os.walk(directory):
+                for file_name in files:
+                    name = os.path.relpath(os.path.join(root, file_name),
+                                           directory)
+                    name = name.replace(os.sep, '/')
+                    try:
+                        backend.get_template(name)
+                    except TemplateSyntaxError:
+                        logger.exception('Template %s does not compile', name)
+                    else:
+                        count += 1
+    return count
+
+
+def populate_urls():
+    """Builds reverse maps of the root and every namespace resolver."""
+    resolver = get_resolver()
+    # Reading reverse_dict populates the resolver.
+    resolver.reverse_dict
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        namespace_resolver.reverse_dict
+
+
+def setup_backends():
+    # Lazy objects of sorl are set up on first attribute access.
+    for lazy in (default.backend, default.engine, default.kvstore,
+                 default.storage):
+        lazy.__class__
+    caches['default'].get('warmup')
+
+
+def request_pages(application):
+    """Requests settings.WARMUP_VIEWS as an anonymous user."""
+    for view_name in settings.WARMUP_VIEWS:
+        status, _ = benchmark.call(application, 'GET', reverse(view_name))
+        if status >= 500:
+            logger.warning('Warm-up request to %s failed: %s',
+                           view_name, status)
+
+
+def run(application):
+    """Warms this process up, returns seconds taken by every step."""
+    steps = {
+        'urls': populate_urls,
+        'templates': compile_templates,
+        'backends': setup_backends,
+        'requests': lambda: request_pages(application),
+    }
+    timings = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    # A server may fork workers after loading the application, they
+    # must not share database connections.
+    connections.close_all()
+    return timings
@@ -2,6 +2,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import filter_posts
 
 
 class CommentInline(admin.StackedInline):
@@ -25,6 +26,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Searches text through the full-text index."""
+        if not search_term:
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
 
 class FollowAdmin(admin.ModelAdmin):
     """Convenient representation of follows for management."""
@@ -0,0 +1,134 @@
+"""Cache scopes of pages and HTTP validators built from them.
+
+Every write bumps the versions of the scopes it touches (see signals),
+so a page validator made of its scope versions changes exactly when
+the page may change and costs no database query beyond a key lookup.
+Pages of anonymous users are also kept whole under their validator.
+"""
+import hashlib
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, quote_etag)
+
+from core import page_cache
+from core.cache import get_versions
+
+from .models import Group, Post, User
+
+
+def index_scopes():
+    return ['posts']
+
+
+def follow_scopes(user_id):
+    return ['posts', f'follows:{user_id}']
+
+
+def group_scopes(group_id):
+    return [f'group:{group_id}', 'users']
+
+
+def profile_scopes(author_id):
+    return [f'author:{author_id}', 'groups']
+
+
+def post_scopes(post_id, author_id):
+    return [f'post:{post_id}', f'author:{author_id}', 'groups', 'users']
+
+
+def _index(request):
+    return index_scopes()
+
+
+def _group(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return group_id and group_scopes(group_id)
+
+
+def _profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return author_id and profile_scopes(author_id)
+
+
+def _post(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    return author_id and post_scopes(post_id, author_id)
+
+
+def _etag_func(scopes):
+    def etag(request, *args, **kwargs):
+        names = scopes(request, *args, **kwargs)
+        if not names:
+            return None
+        user = request.user
+        token = ''
+        if user.is_authenticated:
+            # Header shows the username, profile shows follow buttons.
+            names = [*names, 'users', f'follows:{user.pk}']
+            # Forms carry the CSRF token, a 304 must not keep a rotated
+            # one. get_token sets the secret up when the client has none.
+            get_token(request)
+            token = request.META['CSRF_COOKIE']
+        raw = '|'.join((request.get_full_path(),
+                        str(user.pk),
+                        token,
+                        get_versions(*names)))
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
+
+
+def conditional_page(scopes):
+    """Answers 304 Not Modified while scope versions stay the same.
+
+    Clients are asked to revalidate on every use, shared caches may
+    keep only pages of anonymous users. Those pages are served from
+    the page cache until a write touches one of their scopes.
+    """
+    etag_func = _etag_func(scopes)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            if etag is None:
+                # Missing object, the view answers 404.
+                response = view(request, *args, **kwargs)
+            else:
+                response = _cached_view(view, request, etag, *args, **kwargs)
+            visibility = (
+                'private' if request.user.is_authenticated else 'public'
+            )
+            patch_cache_control(response, no_cache=True, **{visibility: True})
+            return response
+        return wrapper
+    return decorator
+
+
+def _cached_view(view, request, etag, *args, **kwargs):
+    quoted = quote_etag(etag)
+    response = get_conditional_response(request, etag=quoted)
+    if response is not None:
+        return response
+    cacheable = page_cache.is_cacheable(request)
+    response = page_cache.get(etag) if cacheable else None
+    if response is None:
+        response = view(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            response.setdefault('ETag', quoted)
+        if cacheable:
+            page_cache.set(request, etag, response)
+    return response
+
+
+index_page = conditional_page(_index)
+group_page = conditional_page(_group)
+profile_page = conditional_page(_profile)
+post_page = conditional_page(_post)
@@ -0,0 +1,64 @@
+"""Keeps denormalized counters of users and posts up to date."""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post, User
+
+
+def _shift(queryset, field, delta):
+    if delta < 0:
+        # A drifted counter must not break deletion, recount repairs it.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def shift_posts(author_id, delta):
+    _shift(AuthorStats.objects.filter(user_id=author_id), 'posts_count', delta)
+
+
+def shift_comments(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def shift_follows(follow, delta):
+    _shift(AuthorStats.objects.filter(user_id=follow.author_id),
+           'followers_count',
+           delta)
+    _shift(AuthorStats.objects.filter(user_id=follow.user_id),
+           'following_count',
+           delta)
+
+
+def _count(queryset, field):
+    """Correlated subquery counting rows of queryset by field."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount():
+    """Recalculates every counter from source tables.
+
+    Returns the number of users whose stats rows were missing.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    created = AuthorStats.objects.bulk_create(
+        AuthorStats(user_id=pk) for pk in missing.iterator()
+    )
+    AuthorStats.objects.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+    Post.objects.update(comments_count=_count(Comment.objects.all(), 'post'))
+    return len(created)
@@ -1,6 +1,11 @@
 from django import forms
+from django.db import transaction
 
+from core import db
+
+from . import images
 from .models import Comment, Post
+from .thumbnails import enqueue
 
 
 def _text_validation(text):
@@ -33,6 +38,27 @@ class PostForm(forms.ModelForm):
         _text_validation(text)
         return text
 
+    def save(self, commit=True):
+        replaced = None
+        if 'image' in self.changed_data and self.initial.get('image'):
+            replaced = (self.initial['image'].name, self.instance.image_widths)
+        uploaded = bool(self.instance.image) and 'image' in self.changed_data
+        image = None
+        if uploaded:
+            image = images.prepare(self.instance)
+        post = super().save(commit)
+        if commit and uploaded:
+            # A retried or failed view leaves no files of this run.
+            db.on_rollback(lambda: images.delete(post))
+            images.store_variants(post, image)
+            enqueue(post)
+        if commit and replaced:
+            # Pages keep showing the old variants until the edit commits.
+            transaction.on_commit(
+                lambda: images.delete_variants(*replaced)
+            )
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -1,8 +1,191 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
 
 LIMIT = 10
+COMMENTS_LIMIT = 20
+KEYS = ('-created', '-id')
+# Databases keep integers in at most 8 bytes.
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def _encode_cursor(values):
+    """Packs key values of a row into an opaque url-safe token."""
+    values = [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(token, size):
+    """Unpacks token into key values, None if the token is broken."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _seek(keys, values, forward):
+    """Builds condition of rows lying after values in order of keys."""
+    condition = Q()
+    equal = {}
+    for key, value in zip(keys, values):
+        name = key.lstrip('-')
+        descending = key.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def _reverse(keys):
+    return [key[1:] if key.startswith('-') else f'-{key}' for key in keys]
+
+
+class KeysetPage(Sequence):
+    """Page of objects located by cursor of last seen row keys.
+
+    Unlike Paginator it never counts rows and never skips them with
+    OFFSET, so every page costs one indexed range scan.
+    """
+
+    def __init__(self, objects, keys, query, limit=LIMIT, transform=None):
+        self.objects = objects
+        self.keys = keys
+        self.query = query
+        self.limit = limit
+        self.transform = transform
+        self.after = query.get('after')
+        self.before = query.get('before')
+        self.cursor = (
+            f'before:{self.before}' if self.before
+            else f'after:{self.after}' if self.after
+            else ''
+        )
+
+    def _clean(self, values):
+        """Converts cursor values to their key fields, None if one fails."""
+        annotations = self.objects.query.annotations
+        cleaned = []
+        for key, value in zip(self.keys, values):
+            name = key.lstrip('-')
+            field = (annotations[name].output_field if name in annotations
+                     else self.objects.model._meta.get_field(name))
+            try:
+                value = field.clean(value, None)
+            except (ValidationError, TypeError, ValueError):
+                return None
+            # Keys are never null, integers out of the column range make
+            # the query fail.
+            if value is None or isinstance(value, int) and not (
+                    -MAX_INTEGER - 1 <= value <= MAX_INTEGER):
+                return None
+            cleaned.append(value)
+        return cleaned
+
+    def _fetch(self):
+        names = [key.lstrip('-') for key in self.keys]
+        token, forward = (
+            (self.before, False) if self.before else (self.after, True)
+        )
+        values = token and _decode_cursor(token, len(names))
+        values = values and self._clean(values)
+        if not values:
+            # A broken cursor of either direction shows the first page.
+            forward = True
+        objects = self.objects
+        if values:
+            objects = objects.filter(_seek(self.keys, values, forward))
+        order = self.keys if forward else _reverse(self.keys)
+        rows = list(objects.order_by(*order)[:self.limit + 1])
+        more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if forward:
+            return rows, names, bool(values), more
+        if not more:
+            # Stepped back to the beginning: show a full first page.
+            rows = list(self.objects.order_by(*self.keys)[:self.limit + 1])
+            return rows[:self.limit], names, False, len(rows) > self.limit
+        rows.reverse()
+        return rows, names, True, True
+
+    @cached_property
+    def _page(self):
+        return self._fetch()
+
+    @cached_property
+    def object_list(self):
+        rows = self._page[0]
+        return self.transform(rows) if self.transform else rows
+
+    def _row_cursor(self, row):
+        return _encode_cursor([getattr(row, name) for name in self._page[1]])
+
+    def _querystring(self, **params):
+        query = self.query.copy()
+        for name in ('after', 'before', 'page'):
+            query.pop(name, None)
+        query.update(params)
+        return query.urlencode()
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<KeysetPage {self.cursor or "first"}>'
+
+    def has_previous(self):
+        return self._page[2]
+
+    def has_next(self):
+        return self._page[3]
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        rows = self._page[0]
+        return self._row_cursor(rows[-1]) if self.has_next() else None
+
+    @property
+    def previous_cursor(self):
+        rows = self._page[0]
+        return self._row_cursor(rows[0]) if self.has_previous() else None
+
+    @property
+    def first_querystring(self):
+        return self._querystring()
+
+    @property
+    def next_querystring(self):
+        return self._querystring(after=self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(before=self.previous_cursor)
+
 
+def get_page_obj(request, objects, keys=KEYS, transform=None, limit=LIMIT):
+    """Converts objects in instance KeysetPage with request.
 
-def get_page_obj(request, objects):
-    """Converts objects in instance Page with request"""
-    return Paginator(objects, LIMIT).get_page(request.GET.get('page'))
+    keys are ordering fields that identify a row uniquely, their names
+    without sign are read from fetched rows to build cursors. transform
+    is applied to fetched rows before they are shown.
+    """
+    return KeysetPage(objects, keys, request.GET, limit, transform)
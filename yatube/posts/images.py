@@ -0,0 +1,101 @@
+"""Re-encodes uploaded post images into responsive variants."""
+import base64
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+WIDTHS = (320, 640, 960)
+FORMATS = {'jpg': 'JPEG', 'webp': 'WEBP'}
+QUALITY = 82
+PLACEHOLDER_WIDTH = 16
+
+
+def variant_name(name, width, extension):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'posts/variants/{stem}_{width}.{extension}'
+
+
+def variant_url(name, width, extension):
+    return default_storage.url(variant_name(name, width, extension))
+
+
+def _encode(image, extension, **options):
+    buffer = BytesIO()
+    image.save(buffer, FORMATS[extension], quality=QUALITY, **options)
+    return buffer.getvalue()
+
+
+def _decode(file):
+    """Opens upload upright and flattened, dropping EXIF and alpha."""
+    file.seek(0)
+    image = ImageOps.exif_transpose(Image.open(file))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _widths(width):
+    return [size for size in WIDTHS if size < width] + [min(width, WIDTHS[-1])]
+
+
+def _placeholder(image):
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, height))
+    data = base64.b64encode(_encode(tiny, 'jpg')).decode()
+    return f'data:image/jpeg;base64,{data}'
+
+
+def prepare(post):
+    """Replaces freshly uploaded image of unsaved post by clean JPEG.
+
+    Fills in dimensions and placeholder, returns the decoded image for
+    store_variants.
+    """
+    image = _decode(post.image.file)
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    post.image = ContentFile(
+        _encode(image, 'jpg', optimize=True, progressive=True),
+        name=f'{stem}.jpg',
+    )
+    post.image_width, post.image_height = image.size
+    post.image_placeholder = _placeholder(image)
+    post.image_widths = ''
+    return image
+
+
+def store_variants(post, image):
+    """Saves width variants of saved post image in JPEG and WebP."""
+    widths = _widths(image.width)
+    # Set first, so a failed save knows which files to remove.
+    post.image_widths = ','.join(map(str, widths))
+    for width in widths:
+        height = round(image.height * width / image.width)
+        variant = image.resize((width, height), Image.LANCZOS)
+        for extension in FORMATS:
+            name = variant_name(post.image.name, width, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            default_storage.save(name,
+                                 ContentFile(_encode(variant, extension)))
+    type(post).objects.filter(pk=post.pk).update(
+        image_widths=post.image_widths
+    )
+
+
+def delete_variants(name, widths):
+    """Removes variants of image name made in comma separated widths."""
+    for width in filter(None, widths.split(',')):
+        for extension in FORMATS:
+            default_storage.delete(variant_name(name, width, extension))
+
+
+def delete(post):
+    """Removes the stored image of post with its variants."""
+    delete_variants(post.image.name, post.image_widths)
+    default_storage.delete(post.image.name)
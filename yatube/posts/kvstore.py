@@ -0,0 +1,14 @@
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as BaseKVStore
+
+from core import metrics
+
+
+class KVStore(BaseKVStore):
+    """Thumbnail key value store counting its hits and misses."""
+
+    def get(self, image_file):
+        value = super().get(image_file)
+        metrics.inc('yatube_cache_requests_total',
+                    {'cache': 'thumbnails',
+                     'result': 'miss' if value is None else 'hit'})
+        return value
@@ -0,0 +1,207 @@
+import json
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from core import benchmark
+from posts.models import Follow, Group, Post, User
+
+READS = {
+    'index': 3,
+    'group_posts': 2,
+    'profile': 2,
+    'post_detail': 3,
+}
+# Only authenticated users see the feed of followed authors.
+AUTH_READS = {**READS, 'follow_index': 2}
+WRITES = {'post_create': 1, 'add_comment': 3}
+SAMPLE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Drives the WSGI application with a mix of requests to posts '
+            'views and reports throughput, latency, SQL queries and cache '
+            'hit ratio.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Threads per process.',
+        )
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument(
+            '--auth-share',
+            type=float,
+            default=0.5,
+            help='Share of requests made by logged in users.',
+        )
+        parser.add_argument(
+            '--write-share',
+            type=float,
+            default=0.05,
+            help='Share of authenticated requests that create '
+                 'posts and comments.',
+        )
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=100,
+            help='Number of users logged in for the run.',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=50,
+            help='Requests made before measuring.',
+        )
+        parser.add_argument(
+            '--views',
+            help='Comma separated views to request, all by default, '
+                 'for example index,follow_index.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Path of JSON results.')
+        parser.add_argument(
+            '--compare',
+            help='Path of JSON results of an earlier run.',
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.views = options['views'] and options['views'].split(',')
+        unknown = set(self.views or ()) - {*AUTH_READS, *WRITES}
+        if unknown:
+            raise CommandError(f'Unknown views: {", ".join(sorted(unknown))}')
+        self.load_targets(options['sessions'])
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING(
+                'DEBUG is on, results are not representative.'
+            ))
+        warmup = [self.spec(options) for _ in range(options['warmup'])]
+        benchmark.run(warmup)
+        specs = [self.spec(options) for _ in range(options['requests'])]
+        samples, duration = benchmark.run(
+            specs, options['concurrency'], options['processes']
+        )
+        results = {
+            'revision': benchmark.git_revision(),
+            'finished': timezone.now().isoformat(),
+            'debug': settings.DEBUG,
+            'options': {
+                name: options[name]
+                for name in ('requests', 'concurrency', 'processes',
+                             'auth_share', 'write_share', 'sessions', 'views',
+                             'seed')
+            },
+            'duration': round(duration, 3),
+            **benchmark.summarize(samples, duration),
+        }
+        if options['compare']:
+            results['compare'] = benchmark.compare(
+                results, benchmark.load(options['compare'])
+            )
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+
+    def load_targets(self, sessions):
+        self.post_ids = self._sample(Post.objects.values_list('pk', flat=True))
+        self.slugs = self._sample(Group.objects.values_list('slug', flat=True))
+        self.usernames = self._sample(
+            User.objects.filter(stats__posts_count__gt=0)
+            .values_list('username', flat=True)
+        )
+        if not self.post_ids:
+            raise CommandError('No posts to request, run seed first.')
+        # Followers see a non empty feed, so prefer them for sessions.
+        users = list(User.objects.filter(
+            pk__in=Follow.objects.values('user_id').distinct()[:sessions]
+        ))
+        if len(users) < sessions:
+            users += User.objects.exclude(
+                pk__in=[user.pk for user in users]
+            )[:sessions - len(users)]
+        self.sessions = [benchmark.login_cookies(user) for user in users]
+
+    def _sample(self, values):
+        return list(values.order_by('?')[:SAMPLE])
+
+    def spec(self, options):
+        """Picks a view with arguments for the next request."""
+        cookies = None
+        views = READS
+        if self.sessions and self.rng.random() < options['auth_share']:
+            cookies = self.rng.choice(self.sessions)
+            views = (WRITES if self.rng.random() < options['write_share']
+                     else AUTH_READS)
+        if self.views:
+            # Kinds of requests without any chosen view keep their mix.
+            views = {name: weight for name, weight in views.items()
+                     if name in self.views} or views
+        name = self.rng.choices(list(views), weights=views.values())[0]
+        method, path, data = getattr(self, f'_{name}')()
+        return name, method, path, data, cookies
+
+    def _index(self):
+        return 'GET', reverse('posts:index'), None
+
+    def _follow_index(self):
+        return 'GET', reverse('posts:follow_index'), None
+
+    def _group_posts(self):
+        if not self.slugs:
+            return self._index()
+        slug = self.rng.choice(self.slugs)
+        return 'GET', reverse('posts:group_list', args=[slug]), None
+
+    def _profile(self):
+        if not self.usernames:
+            return self._index()
+        username = self.rng.choice(self.usernames)
+        return 'GET', reverse('posts:profile', args=[username]), None
+
+    def _post_detail(self):
+        post_id = self.rng.choice(self.post_ids)
+        return 'GET', reverse('posts:post_detail', args=[post_id]), None
+
+    def _post_create(self):
+        return 'POST', reverse('posts:post_create'), {
+            'text': f'Benchmark post {self.rng.random()}',
+        }
+
+    def _add_comment(self):
+        post_id = self.rng.choice(self.post_ids)
+        return 'POST', reverse('posts:add_comment', args=[post_id]), {
+            'text': f'Benchmark comment {self.rng.random()}',
+        }
+
+    def report(self, results):
+        total = results['total']
+        self.stdout.write(
+            f'{total["requests"]} requests in {results["duration"]}s, '
+            f'{total["rps"]} req/s, errors: {total["errors"]}'
+        )
+        self.stdout.write(
+            f'{"view":<14}{"count":>7}{"p50 ms":>10}{"p95 ms":>10}'
+            f'{"p99 ms":>10}{"queries":>9}{"cache":>8}'
+        )
+        for name, stats in {**results['views'], 'total': total}.items():
+            ratio = stats['cache_hit_ratio']
+            self.stdout.write(
+                f'{name:<14}{stats["requests"]:>7}{stats["p50_ms"]:>10}'
+                f'{stats["p95_ms"]:>10}{stats["p99_ms"]:>10}'
+                f'{stats["queries_per_request"]:>9}'
+                f'{"-" if ratio is None else ratio:>8}'
+            )
+        for name, changes in results.get('compare', {}).items():
+            self.stdout.write(f'{name}: ' + ', '.join(
+                f'{metric} {change:+.1%}' for metric, change in changes.items()
+                if change is not None
+            ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Generates thumbnails queued by post uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the queue once and exit.',
+        )
+        parser.add_argument('--batch', type=int, default=100)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when the queue is empty.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = thumbnails.process_pending(options['batch'])
+            if done or failed:
+                self.stdout.write(f'Done: {done}, failed: {failed}.')
+            if options['once']:
+                return
+            if not done:
+                time.sleep(options['interval'])
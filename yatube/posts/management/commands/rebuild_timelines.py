@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds follow feeds of all users from scratch.'
+
+    def handle(self, *args, **options):
+        count = timeline.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Timelines rebuilt: {count} entries.')
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Recalculates post, comment and follow counters from scratch.'
+
+    def handle(self, *args, **options):
+        created = counters.recount()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Counters recalculated, missing stats created: {created}.'
+            )
+        )
@@ -0,0 +1,301 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from core import cache
+from posts import counters, follows, images, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'yatube блог пост день город утро вечер кофе код python django '
+    'книга фильм музыка дорога море лес горы снег лето осень зима весна '
+    'работа отдых друзья семья проект идея мысль вопрос ответ новость '
+    'сегодня завтра вчера быстро медленно хорошо плохо интересно'
+).split()
+PASSWORD = 'seed-password'
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _zipf_weights(count, exponent):
+    """Cumulative weights of a power law over ranks 1..count."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+@contextmanager
+def _explicit_created(*models):
+    """Lets bulk_create keep given created instead of auto_now_add."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with a skewed synthetic dataset: '
+            'users, groups, posts, comments and follows.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=200000)
+        parser.add_argument(
+            '--celebrities',
+            type=int,
+            default=10,
+            help='Number of leading authors by posts and by followers.',
+        )
+        parser.add_argument(
+            '--hot-groups',
+            type=int,
+            default=5,
+            help='Groups that get most of posts.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Power law exponent of popularity.',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='Number of distinct generated images to attach to posts.',
+        )
+        parser.add_argument(
+            '--image-share',
+            type=float,
+            default=0.2,
+            help='Share of posts with an image.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument(
+            '--end',
+            type=date.fromisoformat,
+            default=date(2024, 1, 1),
+            help='Date the seeded history ends at, YYYY-MM-DD.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Prefix of generated usernames and group slugs.',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.end = datetime.combine(options['end'], datetime.min.time(),
+                                    tzinfo=timezone.utc)
+        started = time.monotonic()
+        with transaction.atomic(), _explicit_created(Post, Comment):
+            users = self._step('users', self.seed_users)
+            groups = self._step('groups', self.seed_groups)
+            posts = self._step('posts', self.seed_posts, users, groups)
+            self._step('comments', self.seed_comments, users, posts)
+            self._step('follows', self.seed_follows, users)
+            self._step('counters', counters.recount)
+            self._step('timelines', timeline.rebuild)
+        self._step('caches', self.bump_versions, users, groups)
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def _step(self, name, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        self.stdout.write(f'{name}: {time.monotonic() - started:.1f}s')
+        return result
+
+    def _bulk_create(self, model, objects):
+        # Django picks the INSERT size the backend allows, batches only
+        # bound memory taken by generated objects.
+        for batch in _batches(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+
+    def _moment(self):
+        return self.end - timedelta(
+            seconds=self.rng.random() * self.options['days'] * 86400
+        )
+
+    def _text(self, low, high):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def _popularity(self, ids, leaders):
+        """Shuffles ids so that leaders come first, returns cum weights."""
+        ids = list(ids)
+        self.rng.shuffle(ids)
+        weights = _zipf_weights(len(ids), self.options['skew'])
+        if leaders:
+            # Leaders share half of the total weight.
+            boost = weights[-1] / leaders
+            weights = [weight + boost * min(rank + 1, leaders)
+                       for rank, weight in enumerate(weights)]
+        return ids, weights
+
+    def bump_versions(self, users, groups):
+        """Makes cached pages stale, bulk inserts send no signals."""
+        cache.bump('posts', 'users', 'groups',
+                   *(f'group:{pk}' for pk in groups),
+                   *(f'{scope}:{pk}' for pk in users
+                     for scope in ('author', 'follows')))
+        for pk in users:
+            follows.invalidate(pk)
+
+    def seed_users(self):
+        prefix = self.options['prefix']
+        password = make_password(PASSWORD)
+        first = User.objects.aggregate(last=Max('pk'))['last'] or 0
+        self._bulk_create(User, (
+            User(username=f'{prefix}{first + i}',
+                 first_name=self._text(1, 1).title(),
+                 last_name=self._text(1, 1).title(),
+                 password=password)
+            for i in range(self.options['users'])
+        ))
+        return list(User.objects.filter(pk__gt=first)
+                    .values_list('pk', flat=True))
+
+    def seed_groups(self):
+        prefix = self.options['prefix']
+        first = Group.objects.aggregate(last=Max('pk'))['last'] or 0
+        self._bulk_create(Group, (
+            Group(title=self._text(1, 3).capitalize(),
+                  slug=f'{prefix}-{first + i}',
+                  description=self._text(5, 20))
+            for i in range(self.options['groups'])
+        ))
+        return list(Group.objects.filter(pk__gt=first)
+                    .values_list('pk', flat=True))
+
+    def _images(self):
+        """Generates distinct images with stored variants."""
+        templates = []
+        for i in range(self.options['images']):
+            size = (self.rng.randint(400, 1600), self.rng.randint(300, 1200))
+            picture = Image.new('RGB', size, tuple(
+                self.rng.randrange(256) for _ in range(3)
+            ))
+            draw = ImageDraw.Draw(picture)
+            for _ in range(8):
+                left, right = sorted(self.rng.randrange(size[0])
+                                     for _ in range(2))
+                top, bottom = sorted(self.rng.randrange(size[1])
+                                     for _ in range(2))
+                draw.ellipse((left, top, right, bottom), fill=tuple(
+                    self.rng.randrange(256) for _ in range(3)
+                ))
+            buffer = BytesIO()
+            picture.save(buffer, 'PNG')
+            post = Post(image=ContentFile(buffer.getvalue(),
+                                          name=f'seed_{i}.png'))
+            decoded = images.prepare(post)
+            post.image.save(post.image.name, post.image.file, save=False)
+            images.store_variants(post, decoded)
+            templates.append({
+                'image': post.image.name,
+                **{field: getattr(post, field)
+                   for field in ('image_width', 'image_height',
+                                 'image_placeholder', 'image_widths')},
+            })
+        return templates
+
+    def seed_posts(self, users, groups):
+        first = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        authors, author_weights = self._popularity(
+            users, self.options['celebrities']
+        )
+        groups, group_weights = self._popularity(
+            groups, self.options['hot_groups']
+        )
+        pictures = self._images()
+        share = self.options['image_share']
+
+        def post():
+            fields = {}
+            if pictures and self.rng.random() < share:
+                fields = self.rng.choice(pictures)
+            group = None
+            if groups and self.rng.random() < 0.7:
+                group = self.rng.choices(groups, cum_weights=group_weights)[0]
+            return Post(
+                text=self._text(5, 60),
+                author_id=self.rng.choices(
+                    authors, cum_weights=author_weights
+                )[0],
+                group_id=group,
+                created=self._moment(),
+                **fields,
+            )
+
+        self._bulk_create(Post,
+                          (post() for _ in range(self.options['posts'])))
+        return list(Post.objects.filter(pk__gt=first)
+                    .values_list('pk', flat=True))
+
+    def seed_comments(self, users, posts):
+        if not posts:
+            return
+        hot_posts, weights = self._popularity(posts, 0)
+        self._bulk_create(Comment, (
+            Comment(
+                post_id=self.rng.choices(hot_posts, cum_weights=weights)[0],
+                author_id=self.rng.choice(users),
+                text=self._text(1, 30),
+                created=self._moment(),
+            )
+            for _ in range(self.options['comments'])
+        ))
+
+    def seed_follows(self, users):
+        if len(users) < 2:
+            return
+        authors, weights = self._popularity(
+            users, self.options['celebrities']
+        )
+        existing = set(Follow.objects.filter(user_id__in=users)
+                       .values_list('user_id', 'author_id'))
+        wanted = min(self.options['follows'],
+                     len(users) * (len(users) - 1) - len(existing))
+
+        def follows():
+            made = 0
+            while made < wanted:
+                pair = (
+                    self.rng.choice(users),
+                    self.rng.choices(authors, cum_weights=weights)[0],
+                )
+                if pair[0] != pair[1] and pair not in existing:
+                    existing.add(pair)
+                    made += 1
+                    yield Follow(user_id=pair[0], author_id=pair[1])
+
+        self._bulk_create(Follow, follows())
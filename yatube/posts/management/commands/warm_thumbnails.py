@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Pre-generates thumbnails of all existing post images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of worker processes, all CPUs by default.',
+        )
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        for name, error in thumbnails.warm(options['workers']):
+            if error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+            else:
+                done += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Warmed: {done}, failed: {failed}.')
+        )
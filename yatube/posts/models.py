@@ -4,6 +4,8 @@ from django.db import models
 
 from core.models import CreateModel
 
+from .images import variant_url
+
 User = get_user_model()
 
 
@@ -54,6 +56,12 @@ class Follow(models.Model):
                 name='no_self_follows'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -85,17 +93,74 @@ class Post(CreateModel):
         upload_to='posts/',
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False,
+    )
+    image_widths = models.CharField(
+        'Ширины вариантов картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         """Sorted all posts by date."""
 
         ordering = ('-created',)
+        # Ascending columns: a backward scan yields (created, id) DESC.
+        indexes = [
+            models.Index(
+                fields=['author', 'created'],
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', 'created'],
+                name='post_group_created_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    def _srcset(self, extension):
+        return ', '.join(
+            f'{variant_url(self.image.name, width, extension)} {width}w'
+            for width in self.image_widths.split(',')
+        )
+
+    @property
+    def image_srcset(self):
+        return self._srcset('jpg')
+
+    @property
+    def image_webp_srcset(self):
+        return self._srcset('webp')
+
+    @property
+    def image_src(self):
+        """Url of the widest variant."""
+        width = self.image_widths.split(',')[-1]
+        return variant_url(self.image.name, width, 'jpg')
+
 
 class Comment(CreateModel):
     post = models.ForeignKey(
@@ -117,5 +182,86 @@ class Comment(CreateModel):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+
+
+class AuthorStats(models.Model):
+    """Denormalized counters of a user kept in line by signals."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class Timeline(models.Model):
+    """Materialized follow feed: posts of followed authors per user."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_posts'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-post'],
+                name='timeline_user_created_idx'
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class ThumbnailJob(CreateModel):
+    """Queued thumbnail generation for an uploaded image."""
+
+    image = models.CharField('Файл картинки', max_length=255)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    error = models.TextField('Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+
+    def __str__(self) -> str:
+        return self.image
@@ -0,0 +1,102 @@
+"""Full-text search over posts backed by SQLite FTS5."""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+POST_TABLE = Post._meta.db_table
+
+SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"text, content='{POST_TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF text ON {POST_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+]
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    """Creates index table and sync triggers unless they exist.
+
+    SQLite drops triggers whenever a migration remakes the posts table,
+    so this runs after every migrate.
+    """
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+
+
+def rebuild(using=connection):
+    """Reindexes text of all existing posts."""
+    install(using)
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def match_query(text):
+    """Turns user input into a safe FTS5 query of prefix terms."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_posts(queryset, text):
+    """Filters posts matching text, annotates them with rank.
+
+    Lower rank is more relevant.
+    """
+    match = match_query(text)
+    if not match:
+        # Keeps rank, views still order the empty result by it.
+        return queryset.annotate(
+            rank=Value(0.0, output_field=FloatField())
+        ).none()
+    if not is_supported():
+        return queryset.filter(text__icontains=text).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    return queryset.annotate(
+        rank=RawSQL(f'bm25({FTS_TABLE})', (), output_field=FloatField())
+    ).extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE} MATCH %s',
+               f'{FTS_TABLE}.rowid = {POST_TABLE}.id'],
+        params=[match],
+    )
+
+
+def filter_posts(queryset, text):
+    """Filters posts matching text without ranking them."""
+    match = match_query(text)
+    if not match:
+        return queryset.none()
+    if not is_supported():
+        return queryset.filter(text__icontains=text)
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match,)
+    ))
@@ -0,0 +1,132 @@
+"""Denormalized data of app posts kept in line with source tables."""
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import cache
+
+from . import counters, follows, search, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+# Fields of users shown on pages, other changes keep cached pages valid.
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        with transaction.atomic():
+            counters.shift_posts(instance.author_id, 1)
+            timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.shift_posts(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.shift_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        with transaction.atomic():
+            counters.shift_follows(instance, 1)
+            timeline.backfill(instance)
+        transaction.on_commit(
+            lambda: follows.add(instance.user_id, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    with transaction.atomic():
+        counters.shift_follows(instance, -1)
+        timeline.prune(instance)
+    transaction.on_commit(
+        lambda: follows.remove(instance.user_id, instance.author_id)
+    )
+
+
+def install_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    search.install(connections[using])
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, raw=False, **kwargs):
+    instance._saved_group_id = None
+    if instance.pk and not raw:
+        instance._saved_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    groups = {instance.group_id, getattr(instance, '_saved_group_id', None)}
+    cache.bump_on_commit('posts',
+                         f'post:{instance.pk}',
+                         f'author:{instance.author_id}',
+                         *(f'group:{pk}' for pk in groups if pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    cache.bump_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    cache.bump_on_commit(f'author:{instance.author_id}',
+                         f'author:{instance.user_id}',
+                         f'follows:{instance.user_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    cache.bump_on_commit('posts', 'groups', f'group:{instance.pk}')
+
+
+@receiver(pre_save, sender=User)
+def remember_names(sender, instance, raw=False, **kwargs):
+    instance._saved_names = None
+    if instance.pk and not raw:
+        instance._saved_names = User.objects.filter(
+            pk=instance.pk
+        ).values_list(*DISPLAYED_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None,
+                    **kwargs):
+    # A new user has nothing on pages yet, logins only touch last_login.
+    if created or (update_fields
+                   and not set(update_fields) & set(DISPLAYED_USER_FIELDS)):
+        return
+    names = tuple(getattr(instance, field) for field in DISPLAYED_USER_FIELDS)
+    if names != getattr(instance, '_saved_names', None):
+        cache.bump_on_commit('posts', 'users', f'author:{instance.pk}')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user(sender, instance, **kwargs):
+    cache.bump_on_commit('posts', 'users', f'author:{instance.pk}')
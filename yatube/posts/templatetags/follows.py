@@ -0,0 +1,11 @@
+from django import template
+
+from posts import follows
+
+register = template.Library()
+
+
+@register.filter
+def followed_by(author, user):
+    """{% if author|followed_by:user %}, author is a user or an id."""
+    return follows.is_following(user, getattr(author, 'pk', author))
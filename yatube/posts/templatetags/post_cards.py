@@ -0,0 +1,58 @@
+"""Post cards rendered once and shared by all users and pages.
+
+A card is stored under a digest of the fields it shows, so an edit of
+the post, a renamed author or a changed group slug gives the card a new
+key and only that card is rendered again.
+"""
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+KEY_PREFIX = 'card:'
+CARD_TEMPLATE = 'posts/includes/post.html'
+SEPARATOR = '\n<hr>\n'
+
+
+def _key(post, show_author, show_group):
+    fields = [post.pk, post.text, post.created.isoformat(), post.image.name,
+              post.image_width, post.image_height, post.image_placeholder,
+              post.image_widths]
+    # Related rows are read only if the card shows them.
+    if show_author:
+        fields += [post.author.username, post.author.get_full_name()]
+    if show_group:
+        fields.append(post.group.slug if post.group_id else None)
+    digest = hashlib.md5(repr(fields).encode()).hexdigest()
+    variant = f'{show_author:d}{show_group:d}'
+    return f'{KEY_PREFIX}{variant}:{post.pk}:{digest}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Renders cards of posts, cached ones are fetched in one lookup.
+
+    Cards on the page of an author skip the author, cards on the page
+    of a group skip the group link.
+    """
+    author = context.get('author')
+    group = context.get('group')
+    posts = list(posts)
+    keys = [_key(post, not author, not group) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            # Rendered without request, so nothing personal gets in.
+            missing[key] = get_template(CARD_TEMPLATE).render(
+                {'post': post, 'author': author, 'group': group}
+            )
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+        cards.update(missing)
+    return mark_safe(SEPARATOR.join(cards[key] for key in keys))
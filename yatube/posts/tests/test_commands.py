@@ -0,0 +1,224 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.cache import get_versions
+
+from ..models import (AuthorStats, Comment, Follow, Group, Post,
+                      ThumbnailJob, Timeline, User)
+from ..search import search_posts
+from ..thumbnails import SIZES
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class RebuildTimelinesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f'Text {i} post', author=cls.author) for i in range(3)
+        )
+
+    def test_rebuild_restores_entries_missed_by_signals(self):
+        self.assertFalse(Timeline.objects.exists())
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            set(Timeline.objects.values_list('post_id', flat=True)),
+            set(Post.objects.values_list('pk', flat=True))
+        )
+        self.assertFalse(
+            Timeline.objects.exclude(user=RebuildTimelinesTest.user).exists()
+        )
+
+
+class RecountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(text='Text post', author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f'Text {i} post', author=cls.author) for i in range(3)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Comment {i}')
+            for i in range(2)
+        )
+
+    def test_recount_repairs_drift(self):
+        AuthorStats.objects.filter(user=RecountTest.user).delete()
+        call_command('recount', stdout=StringIO())
+        author_stats = AuthorStats.objects.get(user=RecountTest.author)
+        self.assertEqual(author_stats.posts_count, 4)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=RecountTest.user).following_count,
+            1
+        )
+        self.assertEqual(
+            Post.objects.get(pk=RecountTest.post.pk).comments_count,
+            2
+        )
+
+
+class RebuildSearchIndexTest(TestCase):
+    def test_rebuild_indexes_existing_posts(self):
+        user = User.objects.create_user(username='user')
+        post = Post.objects.create(text='Indexed words', author=user)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO posts_post_fts(posts_post_fts) "
+                "VALUES ('delete-all')"
+            )
+        self.assertFalse(search_posts(Post.objects.all(), 'Indexed'))
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(
+            list(search_posts(Post.objects.all(), 'Indexed')), [post]
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        cls.post = Post.objects.create(
+            text='Text post',
+            author=User.objects.create_user(username='user'),
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def _thumbnails(self):
+        source = ImageFile(ThumbnailsTest.post.image)
+        return default.kvstore._get(source.key, identity='thumbnails') or []
+
+    def test_worker_processes_queue(self):
+        ThumbnailJob.objects.create(image=ThumbnailsTest.post.image.name)
+        ThumbnailJob.objects.create(image='posts/missing.gif')
+        call_command('process_thumbnails', once=True, stdout=StringIO())
+        self.assertEqual(len(self._thumbnails()), len(SIZES))
+        self.assertEqual(
+            list(ThumbnailJob.objects.values_list('image', 'attempts')),
+            [('posts/missing.gif', 1)]
+        )
+
+    def test_warm_generates_thumbnails_of_existing_posts(self):
+        call_command('warm_thumbnails', workers=1, stdout=StringIO())
+        self.assertEqual(len(self._thumbnails()), len(SIZES))
+
+
+class SeedTest(TestCase):
+    options = {
+        'users': 30,
+        'groups': 4,
+        'posts': 200,
+        'comments': 100,
+        'follows': 120,
+        'celebrities': 2,
+        'hot_groups': 1,
+        'seed': 7,
+        'stdout': StringIO(),
+    }
+
+    def test_seed_creates_consistent_data(self):
+        versions = get_versions('posts', 'users', 'groups')
+        call_command('seed', prefix='first', **SeedTest.options)
+        self.assertNotEqual(get_versions('posts', 'users', 'groups'),
+                            versions)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 120)
+        self.assertEqual(AuthorStats.objects.count(), 30)
+        author = Post.objects.values_list('author', flat=True)[0]
+        self.assertEqual(
+            AuthorStats.objects.get(user=author).posts_count,
+            Post.objects.filter(author=author).count()
+        )
+        self.assertEqual(
+            Timeline.objects.count(),
+            sum(AuthorStats.objects.get(user=follow.author).posts_count
+                for follow in Follow.objects.all())
+        )
+        self.assertTrue(search_posts(Post.objects.all(), 'пост'))
+
+    def test_seed_is_deterministic(self):
+        call_command('seed', prefix='first', **SeedTest.options)
+        first = list(Post.objects.order_by('pk').values_list('text',
+                                                             'created'))
+        Post.objects.all().delete()
+        call_command('seed', prefix='second', **SeedTest.options)
+        second = list(Post.objects.order_by('pk').values_list('text',
+                                                              'created'))
+        self.assertEqual(first, second)
+        self.assertLess(max(created for _, created in second).date(),
+                        date(2024, 1, 1))
+
+
+class BenchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Test title',
+            slug='test-slug',
+            description='Test description',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.create(
+            text='Text post',
+            author=cls.author,
+            group=cls.group,
+        )
+
+    def test_bench_writes_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench', requests=40, concurrency=1, warmup=0,
+                         auth_share=0.5, write_share=0.3, output=output,
+                         stdout=StringIO(), stderr=StringIO())
+            with open(output, encoding='utf-8') as file:
+                results = json.load(file)
+        self.assertEqual(results['total']['requests'], 40)
+        self.assertEqual(results['total']['errors'], 0)
+        self.assertIn('post_detail', results['views'])
+        self.assertGreater(results['views']['index']['queries_per_request'],
+                           0)
+        self.assertTrue(Comment.objects.filter(
+            text__startswith='Benchmark comment'
+        ).exists())
@@ -1,13 +1,22 @@
+import os
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
 from django.test import TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
-from ..models import Comment, Group, Post, User
+from core.testing import run_commit_callbacks
+
+from ..images import variant_name
+from ..models import Comment, Group, Post, ThumbnailJob, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -65,10 +74,13 @@ class FormsTest(TestCase):
             data=self.comment_form_data,
             follow=True
         )
+        comment = Comment.objects.filter(post=post).latest('pk')
         self.assertRedirects(
             response,
             reverse('posts:post_detail', args=[post.pk])
+            + f'#comment-{comment.pk}'
         )
+        self.assertContains(response, f'id="comment-{comment.pk}"')
         self.assertEqual(
             Comment.objects.filter(post=post).count(),
             comments_count + 1
@@ -87,6 +99,49 @@ class FormsTest(TestCase):
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
 
+    def test_post_form_skips_thumbnails_of_upload_with_variants(self):
+        self.client.post(
+            reverse('posts:post_create'),
+            data=self.post_form_data,
+        )
+        post = Post.objects.get(text=self.post_form_data['text'])
+        self.assertTrue(post.image_widths)
+        self.assertFalse(
+            ThumbnailJob.objects.filter(image=post.image.name).exists()
+        )
+
+    def test_post_form_makes_clean_responsive_variants(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010f] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 700), 'red').save(buffer, 'JPEG', exif=exif)
+        self.post_form_data['image'] = SimpleUploadedFile(
+            name='photo.jpg',
+            content=buffer.getvalue(),
+            content_type='image/jpeg'
+        )
+        self.client.post(
+            reverse('posts:post_create'),
+            data=self.post_form_data,
+        )
+        post = Post.objects.get(text=self.post_form_data['text'])
+        self.assertEqual((post.image_width, post.image_height), (700, 1000))
+        self.assertEqual(post.image_widths, '320,640,700')
+        self.assertTrue(post.image_placeholder.startswith('data:image/'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (700, 1000))
+            self.assertFalse(image.getexif())
+        for width in (320, 640, 700):
+            for extension in ('jpg', 'webp'):
+                with self.subTest(width=width, extension=extension):
+                    self.assertTrue(default_storage.exists(
+                        variant_name(post.image.name, width, extension)
+                    ))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, post.image_webp_srcset)
+        self.assertContains(response, 'loading="lazy"')
+
     def test_post_form_novalid_data_nocreates_post(self):
         posts_count = Post.objects.count()
         form_novalid_datas = {
@@ -124,3 +179,49 @@ class FormsTest(TestCase):
         self.assertNotEqual(response.context['post'].text, FormsTest.post.text)
         expected = Post.objects.get(id=FormsTest.post.pk)
         self.assertEqual(response.context['post'].text, expected.text)
+
+    def test_post_edit_deletes_variants_of_replaced_image(self):
+        def upload(size):
+            buffer = BytesIO()
+            Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+            return SimpleUploadedFile(name='photo.jpg',
+                                      content=buffer.getvalue(),
+                                      content_type='image/jpeg')
+
+        def variants(post):
+            return [variant_name(post.image.name, width, extension)
+                    for width in post.image_widths.split(',')
+                    for extension in ('jpg', 'webp')]
+
+        url = reverse('posts:post_edit', args=[FormsTest.post.pk])
+        self.post_form_data['image'] = upload((700, 100))
+        self.client.post(url, data=self.post_form_data)
+        old = variants(Post.objects.get(pk=FormsTest.post.pk))
+        self.post_form_data['image'] = upload((400, 100))
+        with run_commit_callbacks():
+            self.client.post(url, data=self.post_form_data)
+        new = variants(Post.objects.get(pk=FormsTest.post.pk))
+        self.assertFalse(any(map(default_storage.exists, old)))
+        self.assertTrue(all(map(default_storage.exists, new)))
+
+    def test_retried_post_create_leaves_no_files_behind(self):
+        def files():
+            return {os.path.join(root, name)
+                    for root, _, names in os.walk(TEMP_MEDIA_ROOT)
+                    for name in names}
+
+        before = files()
+        busy = OperationalError('database is locked')
+        with mock.patch('posts.forms.enqueue', side_effect=[busy, None]), \
+                mock.patch('core.db.DELAY', 0):
+            self.client.post(reverse('posts:post_create'),
+                             data=self.post_form_data)
+        post = Post.objects.get(text=self.post_form_data['text'])
+        stored = [post.image.name, *(
+            variant_name(post.image.name, width, extension)
+            for width in post.image_widths.split(',')
+            for extension in ('jpg', 'webp')
+        )]
+        self.assertEqual(files() - before, {
+            os.path.join(TEMP_MEDIA_ROOT, name) for name in stored
+        })
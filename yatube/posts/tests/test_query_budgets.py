@@ -0,0 +1,98 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from core.testing import QueryBudgetMixin
+
+from ..helpers import COMMENTS_LIMIT, LIMIT
+from ..models import Comment, Follow, Group, Post, User
+
+PAGES = 3
+
+
+class QueryBudgetsTest(QueryBudgetMixin, TestCase):
+    """Views keep their query budgets on pages of distinct rows."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.stranger = User.objects.create_user(username='stranger')
+        for i in range(LIMIT * PAGES):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(
+                title=f'Title {i}',
+                slug=f'slug-{i}',
+                description='Test description',
+            )
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(text=f'Text {i} post',
+                                author=author,
+                                group=group)
+        Post.objects.bulk_create(
+            Post(text=f'Own {i} post', author=cls.stranger, group=group)
+            for i in range(LIMIT * PAGES)
+        )
+        cls.post = Post.objects.filter(author=cls.stranger).first()
+        Comment.objects.bulk_create(
+            Comment(post=cls.post,
+                    author=User.objects.get(username=f'author{i}'),
+                    text=f'Comment {i}')
+            for i in range(COMMENTS_LIMIT + LIMIT)
+        )
+        cls.own_post = Post.objects.create(text='Own post', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetsTest.user)
+        # Pages of the guest must be rendered, not served whole.
+        cache.clear()
+
+    def _pages(self, view_name, args=None, data=None, client=None):
+        """Walks all pages of view_name checking every one."""
+        data = dict(data or {})
+        for _ in range(PAGES + 1):
+            response = self.assertWithinBudget(view_name, args, data,
+                                               client=client)
+            page_obj = (response.context.get('page_obj')
+                        or response.context.get('comments'))
+            if not page_obj.has_next():
+                break
+            data['after'] = page_obj.next_cursor
+
+    def test_read_views_within_budget(self):
+        post = QueryBudgetsTest.post
+        pages = [
+            ('posts:index', None, None),
+            ('posts:group_list', [post.group.slug], None),
+            ('posts:profile', [post.author.username], None),
+            ('posts:search', None, {'q': 'post'}),
+            ('posts:post_detail', [post.pk], None),
+            ('posts:post_comments', [post.pk], None),
+        ]
+        for client in (self.guest_client, self.authorized_client):
+            for view_name, args, data in pages:
+                with self.subTest(view_name=view_name, client=client):
+                    self._pages(view_name, args, data, client)
+        self._pages('posts:follow_index', client=self.authorized_client)
+
+    def test_write_views_within_budget(self):
+        post = QueryBudgetsTest.post
+        own_post = QueryBudgetsTest.own_post
+        stranger = QueryBudgetsTest.stranger.username
+        self.client = self.authorized_client
+        self.assertWithinBudget('posts:post_create')
+        self.assertWithinBudget('posts:post_create',
+                                data={'text': 'New post'},
+                                method='post')
+        self.assertWithinBudget('posts:post_edit', [own_post.pk])
+        self.assertWithinBudget('posts:post_edit',
+                                [own_post.pk],
+                                data={'text': 'Edited post'},
+                                method='post')
+        self.assertWithinBudget('posts:add_comment',
+                                [post.pk],
+                                data={'text': 'New comment'},
+                                method='post')
+        self.assertWithinBudget('posts:profile_follow', [stranger])
+        self.assertWithinBudget('posts:profile_unfollow', [stranger])
@@ -0,0 +1,84 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..helpers import COMMENTS_LIMIT, LIMIT
+from ..models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'\bSCAN (TABLE )?\w+(?! USING)( |$)')
+
+
+class QueryPlansTest(TestCase):
+    """Every query behind listing views seeks through an index."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Test title',
+            slug='test-slug',
+            description='Test description',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(LIMIT * 2):
+            Post.objects.create(
+                text=f'Text {i} post',
+                author=cls.author,
+                group=cls.group,
+            )
+        cls.post = Post.objects.order_by('-created', '-id').first()
+        for i in range(COMMENTS_LIMIT * 2):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.user,
+                text=f'Comment {i}',
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlansTest.user)
+
+    def _urls(self):
+        post = QueryPlansTest.post
+        return [
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:group_list', args=[QueryPlansTest.group.slug]),
+            reverse('posts:profile', args=[QueryPlansTest.author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+            reverse('posts:post_comments', args=[post.pk]),
+        ]
+
+    def _plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def _assert_indexed(self, url, params=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in self._plan(sql):
+                with self.subTest(url=url, params=params, sql=sql):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    self.assertIsNone(FULL_SCAN.search(step), step)
+        return response
+
+    def test_views_use_indexes(self):
+        for url in self._urls():
+            response = self._assert_indexed(url)
+            page_obj = (response.context.get('page_obj')
+                        or response.context.get('comments'))
+            self.assertTrue(page_obj.has_next())
+            self._assert_indexed(url, {'after': page_obj.next_cursor})
+            self._assert_indexed(url, {'before': page_obj.next_cursor})
@@ -45,6 +45,7 @@ class UrlsTest(TestCase):
             f'/group/{UrlsTest.group.slug}/': guest_client,
             f'/profile/{post.author.username}/': guest_client,
             f'/posts/{post.pk}/': guest_client,
+            '/search/?q=word': guest_client,
             '/create/': UrlsTest.auth_client,
             f'/posts/{post.pk}/edit/': UrlsTest.author_auth_client,
         }
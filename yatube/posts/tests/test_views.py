@@ -1,18 +1,25 @@
 import shutil
 import tempfile
+from array import array
+from http import HTTPStatus
 from math import ceil
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.paginator import Page
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.cache import get_versions
+from core.testing import run_commit_callbacks
+
+from .. import follows
 from ..forms import CommentForm, PostForm
-from ..helpers import LIMIT
-from ..models import Comment, Follow, Group, Post, User
+from ..helpers import COMMENTS_LIMIT, LIMIT, KeysetPage, _encode_cursor
+from ..models import (AuthorStats, Comment, Follow, Group, Post, Timeline,
+                      User)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -148,8 +155,8 @@ class ViewsTest(TestCase):
             ViewsTest.key_error_message.format(key='page_obj')
         )
         value = response.context.get('page_obj')
-        self.assertIsInstance(value, Page)
-        self.assertEqual(value.object_list, expected)
+        self.assertIsInstance(value, KeysetPage)
+        self.assertEqual(list(value), expected)
 
     def _test_form_context(self, response, ClassForm):
         self.assertIn(
@@ -164,13 +171,15 @@ class ViewsTest(TestCase):
                 self.assertIsInstance(form.fields.get(name), type)
 
     def test_index_page_show_correct_context(self):
-        expected = list(Post.objects.all()[:LIMIT])
+        expected = list(Post.objects.order_by('-created', '-id')[:LIMIT])
         response = self.client.get(ViewsTest.paths.get('index'))
         self._test_page_obj_context(response, expected)
 
     def test_group_page_show_correct_context(self):
         response = self.client.get(ViewsTest.paths.get('group_list'))
-        expected = list(ViewsTest.group.posts.all()[:LIMIT])
+        expected = list(
+            ViewsTest.group.posts.order_by('-created', '-id')[:LIMIT]
+        )
         self._test_page_obj_context(response, expected)
         self.assertIn(
             'group',
@@ -183,7 +192,7 @@ class ViewsTest(TestCase):
         response = self.client.get(ViewsTest.paths.get('profile'))
         self._test_page_obj_context(
             response,
-            list(ViewsTest.user.posts.all()[:LIMIT])
+            list(ViewsTest.user.posts.order_by('-created', '-id')[:LIMIT])
         )
         self.assertIn(
             'author',
@@ -244,16 +253,56 @@ class ViewsTest(TestCase):
             )
         }
         for url, posts in urls_posts.items():
+            params = {}
             for i in range(ceil(posts.count() / LIMIT)):
                 with self.subTest(url=url, page=(i + 1)):
-                    response = self.client.get(
-                        url, {'page': {i + 1}}
-                    )
+                    response = self.client.get(url, params)
+                    page_obj = response.context['page_obj']
                     number_objs = posts[i * LIMIT:(i + 1) * LIMIT].count()
-                    self.assertEqual(
-                        len(response.context['page_obj']),
-                        number_objs
+                    self.assertEqual(len(page_obj), number_objs)
+                    params = {'after': page_obj.next_cursor}
+            self.assertFalse(page_obj.has_next())
+
+    def test_paginator_cursors_walk_back_and_forth(self):
+        url = ViewsTest.paths.get('index')
+        expected = list(Post.objects.order_by('-created', '-id'))
+        first = self.client.get(url).context['page_obj']
+        self.assertFalse(first.has_previous())
+        self.assertEqual(list(first), expected[:LIMIT])
+        second = self.client.get(
+            url, {'after': first.next_cursor}
+        ).context['page_obj']
+        self.assertTrue(second.has_previous())
+        self.assertEqual(list(second), expected[LIMIT:2 * LIMIT])
+        back = self.client.get(
+            url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), expected[:LIMIT])
+
+    def test_paginator_ignores_broken_cursor(self):
+        first = list(Post.objects.order_by('-created', '-id')[:LIMIT])
+        wrong_types = [
+            ['notadate', 1],
+            [{'a': 1}, 2],
+            ['2020-01-01T00:00:00+00:00', 'x'],
+            [None, None],
+            ['2020-01-01T00:00:00+00:00', 2 ** 80],
+        ]
+        tokens = ['broken!', *map(_encode_cursor, wrong_types)]
+        for name in ('after', 'before'):
+            for token in tokens:
+                with self.subTest(name=name, token=token):
+                    response = self.client.get(
+                        ViewsTest.paths.get('index'), {name: token}
                     )
+                    page_obj = response.context['page_obj']
+                    self.assertEqual(list(page_obj), first)
+                    self.assertFalse(page_obj.has_previous())
+        response = self.client.get(
+            reverse('posts:search'),
+            {'q': 'post', 'after': _encode_cursor(['x', 1])},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
 
     def test_post_show_on_index_group_profile(self):
         all_posts = [
@@ -299,16 +348,76 @@ class ViewsTest(TestCase):
         response = self.client.get(
             reverse('posts:post_detail', args=[ViewsTest.other_post.pk]),
         )
-        self.assertEqual(response.context['comments'].first(), expected)
+        self.assertEqual(list(response.context['comments'])[:1],
+                         [expected] if expected else [])
 
-    def test_cache_delete_post_index(self):
+    def test_cache_keeps_index_until_write(self):
         url = ViewsTest.paths.get('index')
         response_old = self.client.get(url)
-        Post.objects.first().delete()
+        Post.objects.filter(pk=Post.objects.first().pk).update(text='Quiet')
         self.assertEqual(self.client.get(url).content, response_old.content)
         cache.clear()
         self.assertNotEqual(self.client.get(url).content, response_old.content)
 
+    def test_cache_delete_post_index(self):
+        url = ViewsTest.paths.get('index')
+        response_old = self.client.get(url)
+        Post.objects.first().delete()
+        self.assertNotEqual(self.client.get(url).content, response_old.content)
+
+    def test_cache_refreshes_pages_after_writes(self):
+        post = ViewsTest.group.posts.order_by('-created', '-id').first()
+        pages = [
+            ViewsTest.paths.get('group_list'),
+            ViewsTest.paths.get('profile'),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+        for url in pages:
+            self.client.get(url)
+        post.text = 'Edited text'
+        post.save()
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Edited text')
+        Comment.objects.create(post=post, author=ViewsTest.user, text='Hi!')
+        self.assertContains(self.client.get(pages[-1]), 'Hi!')
+
+    def test_post_cards_shared_between_users_and_pages(self):
+        def cards_rendered(client, url):
+            response = client.get(url)
+            return response, [template.name for template in response.templates
+                              ].count('posts/includes/post.html')
+
+        url = ViewsTest.paths.get('index')
+        _, rendered = cards_rendered(self.client, url)
+        self.assertEqual(rendered, LIMIT)
+        post = Post.objects.create(text='Fresh post', author=ViewsTest.user)
+        response, rendered = cards_rendered(self.other_client, url)
+        self.assertEqual(rendered, 1)
+        self.assertContains(response, 'Fresh post')
+        post.text = 'Edited post'
+        post.save()
+        response, rendered = cards_rendered(self.client, url)
+        self.assertEqual(rendered, 1)
+        self.assertContains(response, 'Edited post')
+        ViewsTest.user.first_name = 'Renamed'
+        ViewsTest.user.save()
+        response, rendered = cards_rendered(self.client, url)
+        self.assertEqual(rendered, sum(
+            post.author == ViewsTest.user
+            for post in response.context['page_obj']
+        ))
+
+    def test_only_shown_user_fields_refresh_pages(self):
+        versions = get_versions('posts', 'users')
+        User.objects.create_user(username='newcomer')
+        self.client.force_login(ViewsTest.user)
+        ViewsTest.user.save()
+        self.assertEqual(get_versions('posts', 'users'), versions)
+        ViewsTest.user.last_name = 'Renamed'
+        ViewsTest.user.save()
+        self.assertNotEqual(get_versions('posts', 'users'), versions)
+
     def test_post_user_show_on_index_follow_page_follower(self):
         expected = ViewsTest.other_user.posts.first()
         response = self.client.get(reverse('posts:follow_index'))
@@ -319,6 +428,239 @@ class ViewsTest(TestCase):
         response = self.other_client.get(reverse('posts:follow_index'))
         self.assertNotEqual(expected, response.context['page_obj'])
 
+    def test_search_finds_ranked_posts(self):
+        relevant = Post.objects.create(
+            text='Котики котики котики', author=ViewsTest.user
+        )
+        other = Post.objects.create(
+            text='Про котиков и собак', author=ViewsTest.user
+        )
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        self.assertEqual(list(response.context['page_obj']), [relevant, other])
+
+    def test_search_without_query_shows_no_posts(self):
+        for query in ({}, {'q': ''}, {'q': '"*'}):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('posts:search'), query)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse(response.context['page_obj'])
+
+    def test_search_follows_text_edits_and_deletions(self):
+        post = Post.objects.create(text='Старый текст', author=ViewsTest.user)
+        post.text = 'Новый текст'
+        post.save()
+        url = reverse('posts:search')
+        self.assertFalse(self.client.get(url, {'q': 'Старый'})
+                         .context['page_obj'])
+        self.assertIn(post, self.client.get(url, {'q': 'Новый'})
+                      .context['page_obj'])
+        post.delete()
+        self.assertFalse(self.client.get(url, {'q': 'Новый'})
+                         .context['page_obj'])
+
+    def test_search_pages_through_results(self):
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'post'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), LIMIT)
+        response = self.client.get(
+            url, {'q': 'post', 'after': page_obj.next_cursor}
+        )
+        found = list(page_obj) + list(response.context['page_obj'])
+        self.assertCountEqual(
+            found, Post.objects.filter(text__icontains='post')
+        )
+
+    def test_pages_answer_not_modified_until_write(self):
+        post = ViewsTest.post
+        for path_name in ('index', 'group_list', 'profile', 'post_detail'):
+            url = ViewsTest.paths.get(path_name)
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertIn('no-cache', response['Cache-Control'])
+                self.assertNotEqual(self.other_client.get(url)['ETag'], etag)
+                post.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_rotated_csrf_token_changes_validator(self):
+        url = ViewsTest.paths.get('post_detail')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'x' * 32
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_anonymous_pages_cached_until_write(self):
+        guest_client = Client()
+        post = ViewsTest.post
+        for path_name in ('index', 'group_list', 'profile', 'post_detail'):
+            url = ViewsTest.paths.get(path_name)
+            with self.subTest(url=url):
+                rendered = guest_client.get(url)
+                self.assertIsNotNone(rendered.context)
+                cached = guest_client.get(url)
+                self.assertIsNone(cached.context)
+                self.assertEqual(cached.content, rendered.content)
+                self.assertEqual(cached['ETag'], rendered['ETag'])
+                self.assertIn('public', cached['Cache-Control'])
+                self.assertIsNotNone(self.client.get(url).context)
+                self.assertIsNotNone(self.client.get(url).context)
+                post.save()
+                self.assertIsNotNone(guest_client.get(url).context)
+
+    def test_anonymous_page_cache_keyed_by_query(self):
+        guest_client = Client()
+        url = ViewsTest.paths.get('index')
+        first_page = guest_client.get(url)
+        cursor = first_page.context['page_obj'].next_cursor
+        response = guest_client.get(url, {'after': cursor})
+        self.assertIsNotNone(response.context)
+        self.assertNotEqual(response.content, first_page.content)
+
+    def test_new_comment_changes_post_validator(self):
+        url = ViewsTest.paths.get('post_detail')
+        etag = self.client.get(url)['ETag']
+        self.client.post(
+            reverse('posts:add_comment', args=[ViewsTest.post.pk]),
+            data={'text': 'Fresh comment'}
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comments_paged_inline_and_by_fragment(self):
+        post = ViewsTest.other_post
+        Comment.objects.bulk_create(
+            Comment(post=post, author=ViewsTest.user, text=f'Comment {i}')
+            for i in range(COMMENTS_LIMIT + 5)
+        )
+        expected = list(post.comments.order_by('-created', '-id'))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        comments = response.context['comments']
+        self.assertEqual(list(comments), expected[:COMMENTS_LIMIT])
+        self.assertContains(
+            response, reverse('posts:post_comments', args=[post.pk])
+        )
+        fragment = self.client.get(
+            reverse('posts:post_comments', args=[post.pk]),
+            {'after': comments.next_cursor}
+        )
+        self.assertTemplateNotUsed(fragment, 'base.html')
+        self.assertEqual(list(fragment.context['comments']),
+                         expected[COMMENTS_LIMIT:])
+        self.assertNotContains(fragment, 'js-more-comments')
+
+    def test_follow_index_shows_new_post_of_followed_author(self):
+        post = Post.objects.create(
+            text='Fresh post',
+            author=ViewsTest.other_user,
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_follow_and_unfollow_update_timeline(self):
+        user = ViewsTest.other_user
+        self.other_client.get(
+            reverse('posts:profile_follow', args=[ViewsTest.user.username])
+        )
+        self.assertEqual(
+            Timeline.objects.filter(user=user).count(),
+            ViewsTest.user.posts.count()
+        )
+        response = self.other_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(ViewsTest.user.posts.order_by('-created', '-id')[:LIMIT])
+        )
+        self.other_client.get(
+            reverse('posts:profile_unfollow', args=[ViewsTest.user.username])
+        )
+        self.assertFalse(Timeline.objects.filter(user=user).exists())
+
+    def test_followed_ids_cached_and_updated_in_place(self):
+        author = User.objects.create_user(username='author')
+
+        def cached_ids():
+            user = User.objects.get(pk=ViewsTest.other_user.pk)
+            with self.assertNumQueries(0):
+                return list(follows.followed_ids(user))
+
+        response = self.other_client.get(
+            reverse('posts:profile', args=[author.username])
+        )
+        self.assertFalse(response.context['following'])
+        self.assertEqual(cached_ids(), sorted(
+            Follow.objects.filter(user=ViewsTest.other_user)
+            .values_list('author_id', flat=True)
+        ))
+        with run_commit_callbacks():
+            self.other_client.get(
+                reverse('posts:profile_follow', args=[author.username])
+            )
+        ids = cached_ids()
+        self.assertIn(author.pk, ids)
+        self.assertEqual(ids, sorted(ids))
+        user = User.objects.get(pk=ViewsTest.other_user.pk)
+        template = Template('{% load follows %}'
+                            '{% if author|followed_by:user %}yes{% endif %}')
+        with self.assertNumQueries(0):
+            self.assertTrue(follows.is_following(user, author.pk))
+            self.assertEqual(
+                template.render(Context({'author': author, 'user': user})),
+                'yes'
+            )
+        with run_commit_callbacks():
+            self.other_client.get(
+                reverse('posts:profile_unfollow', args=[author.username])
+            )
+        self.assertNotIn(author.pk, cached_ids())
+
+    def test_followed_ids_loaded_before_commit_are_not_kept(self):
+        author = User.objects.create_user(username='author')
+        user = User.objects.get(pk=ViewsTest.other_user.pk)
+        with run_commit_callbacks():
+            Follow.objects.create(user=user, author=author)
+            # Another request caches the array of before the commit.
+            follows.followed_ids(User.objects.get(pk=user.pk))
+            cache.set(follows._key(user.pk), (
+                cache.get(follows._version_key(user.pk)),
+                array(follows.TYPECODE),
+            ))
+        self.assertTrue(
+            follows.is_following(User.objects.get(pk=user.pk), author.pk)
+        )
+
+    def test_counters_follow_writes_and_deletions(self):
+        stats = AuthorStats.objects.get(user=ViewsTest.other_user)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        post = Post.objects.create(text='Counted', author=ViewsTest.other_user)
+        self.client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            data={'text': 'Counted comment'}
+        )
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        self.client.get(
+            reverse(
+                'posts:profile_unfollow',
+                args=[ViewsTest.other_user.username]
+            )
+        )
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(
+            AuthorStats.objects.get(user=ViewsTest.user).following_count,
+            0
+        )
+
     def test_user_can_follow_at_author(self):
         follows_count = Follow.objects.filter(
             user=ViewsTest.other_user
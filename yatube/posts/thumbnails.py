@@ -0,0 +1,77 @@
+"""Generates post thumbnails ahead of the first page view."""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.helpers import ThumbnailError
+
+from .models import Post, ThumbnailJob
+
+# Every thumbnail the templates ask for, as "geometry", options.
+SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+MAX_ATTEMPTS = 5
+
+
+def generate(name):
+    """Creates all thumbnails of the image stored under name."""
+    for geometry, options in SIZES:
+        thumbnail = get_thumbnail(name, geometry, **options)
+        # sorl swallows errors and hands back an image it never stored.
+        if not default.kvstore.get(thumbnail):
+            raise ThumbnailError(f'Could not make {geometry} of {name}')
+    return name
+
+
+def enqueue(post):
+    """Queues thumbnails of post image unless pages show its variants."""
+    if post.image and not post.image_widths:
+        ThumbnailJob.objects.create(image=post.image.name)
+
+
+def process_pending(limit=100):
+    """Runs queued jobs, returns numbers of done and failed ones."""
+    jobs = ThumbnailJob.objects.filter(attempts__lt=MAX_ATTEMPTS)[:limit]
+    done = failed = 0
+    for job in jobs:
+        try:
+            generate(job.image)
+        except Exception as error:
+            job.attempts += 1
+            job.error = repr(error)
+            job.save(update_fields=['attempts', 'error'])
+            failed += 1
+        else:
+            job.delete()
+            done += 1
+    return done, failed
+
+
+def _generate_safely(name):
+    try:
+        return generate(name), None
+    except Exception as error:
+        return name, repr(error)
+
+
+def warm(workers=None):
+    """Generates thumbnails of post images without variants in a pool.
+
+    Yields names of images with an error message or None. A single
+    worker runs in the current process.
+    """
+    names = list(
+        Post.objects.exclude(image='')
+        .filter(image_widths='')
+        .order_by()
+        .values_list('image', flat=True)
+        .distinct()
+    )
+    if workers == 1:
+        yield from map(_generate_safely, names)
+        return
+    # Forked workers must open their own database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_generate_safely, names, chunksize=16)
@@ -0,0 +1,55 @@
+"""Keeps materialized follow feeds in line with posts and follows."""
+from django.db import connection, transaction
+
+from .models import Follow, Post, Timeline
+
+BATCH_SIZE = 1000
+
+
+def fan_out(post):
+    """Puts a new post into the feed of every follower of its author."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post=post, created=post.created)
+         for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follow):
+    """Adds all posts of a freshly followed author to the user feed."""
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).values_list('pk', 'created')
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=follow.user_id, post_id=pk, created=created)
+         for pk, created in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(follow):
+    """Removes posts of an unfollowed author from the user feed."""
+    Timeline.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+
+
+def rebuild():
+    """Recreates all feeds from follows, returns number of entries."""
+    timeline = Timeline._meta.db_table
+    follow = Follow._meta.db_table
+    post = Post._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {timeline}')
+        cursor.execute(
+            f'INSERT INTO {timeline} (user_id, post_id, created) '
+            f'SELECT f.user_id, p.id, p.created '
+            f'FROM {follow} f JOIN {post} p ON p.author_id = f.author_id'
+        )
+        return cursor.rowcount
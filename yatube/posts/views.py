@@ -3,52 +3,94 @@ from functools import partial
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
+from core.cache import get_versions
+from core.db import retry_on_busy
+
+from . import conditional, follows
 from .forms import CommentForm, PostForm
-from .helpers import get_page_obj
+from .helpers import COMMENTS_LIMIT, get_page_obj
 from .models import Follow, Group, Post, User
+from .search import search_posts
 
 
+@conditional.index_page
 def index(request):
     """Display all posts."""
-    posts = Post.objects.prefetch_related('author', 'group')
+    posts = Post.objects.select_related('author', 'group')
+    cache_version = get_versions(*conditional.index_scopes())
     return render(request,
                   'posts/index.html',
-                  context={'page_obj': get_page_obj(request, posts)})
+                  context={'cache_version': cache_version,
+                           'page_obj': get_page_obj(request, posts)})
+
+
+def _entry_posts(entries):
+    return [entry.post for entry in entries]
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    """Display posts of followed authors from the user timeline."""
+    entries = request.user.timeline.select_related('post__author',
+                                                   'post__group')
+    page_obj = get_page_obj(request,
+                            entries,
+                            keys=('-created', '-post_id'),
+                            transform=_entry_posts)
+    cache_version = get_versions(
+        *conditional.follow_scopes(request.user.pk)
+    )
     return render(request,
                   'posts/follow.html',
-                  context={'page_obj': get_page_obj(request, posts)})
+                  context={'cache_version': cache_version,
+                           'page_obj': page_obj})
 
 
+@conditional.group_page
 def group_posts(request, slug):
     """Display all posts group."""
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author')
+    cache_version = get_versions(*conditional.group_scopes(group.pk))
     return render(request,
                   'posts/group_list.html',
-                  context={'group': group,
+                  context={'cache_version': cache_version,
+                           'group': group,
                            'page_obj': get_page_obj(request, posts)})
 
 
+@conditional.profile_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
     posts = author.posts.select_related('group')
-    following = request.user.is_authenticated and (
-        author.following.filter(user=request.user).exists()
-    )
+    following = follows.is_following(request.user, author.pk)
+    cache_version = get_versions(*conditional.profile_scopes(author.pk))
     return render(request,
                   'posts/profile.html',
-                  context={'author': author,
+                  context={'cache_version': cache_version,
+                           'author': author,
                            'following': following,
                            'page_obj': get_page_obj(request, posts)})
 
 
+def search(request):
+    """Display posts matching the query, most relevant first."""
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(Post.objects.select_related('author', 'group'),
+                         query)
+    return render(request,
+                  'posts/search.html',
+                  context={'query': query,
+                           'page_obj': get_page_obj(request,
+                                                    posts,
+                                                    keys=('rank', '-id'))})
+
+
 @login_required
+@retry_on_busy
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
@@ -57,25 +99,48 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_busy
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
 
 
+@conditional.post_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related('author', 'group'),
-                             pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
     form = CommentForm()
-    comments = post.comments.select_related('author')
+    comments = get_page_obj(request,
+                            post.comments.select_related('author'),
+                            limit=COMMENTS_LIMIT)
+    cache_version = get_versions(
+        *conditional.post_scopes(post.pk, post.author_id)
+    )
     return render(request,
                   'posts/post_detail.html',
-                  context={'post': post,
+                  context={'cache_version': cache_version,
+                           'post': post,
                            'form': form,
                            'comments': comments})
 
 
+@conditional.post_page
+def post_comments(request, post_id):
+    """Render next page of post comments as a bare HTML fragment."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = get_page_obj(request,
+                            post.comments.select_related('author'),
+                            limit=COMMENTS_LIMIT)
+    return render(request,
+                  'posts/includes/comments.html',
+                  context={'post': post, 'comments': comments})
+
+
 @login_required
+@retry_on_busy
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -89,8 +154,9 @@ def post_create(request):
 
 
 @login_required
+@retry_on_busy
 def post_edit(request, post_id):
-    post = get_object_or_404(Post.objects.prefetch_related('author', 'group'),
+    post = get_object_or_404(Post.objects.select_related('author', 'group'),
                              pk=post_id)
     get_redirected_page = partial(redirect,
                                   'posts:post_detail',
@@ -111,11 +177,16 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_busy
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         form.instance.author = request.user
         form.instance.post = post
-        form.save()
+        comment = form.save()
+        return redirect(
+            reverse('posts:post_detail', args=[post_id])
+            + f'#comment-{comment.pk}'
+        )
     return redirect('posts:post_detail', post_id)
@@ -0,0 +1,52 @@
+"""Users of sessions kept in the cache between requests."""
+from django.conf import settings
+from django.contrib import auth
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+
+from core import routers
+
+KEY_PREFIX = 'user:'
+
+
+def _key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def get_user(request):
+    """Works as django.contrib.auth.get_user, reads the user from cache.
+
+    The session hash is checked against the cached password, so a
+    session of an outdated password is handled by Django as usual. A
+    miss is read from default, a lagging replica could bring back an
+    old password.
+    """
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if user_id is None:
+        return auth.get_user(request)
+    user = cache.get(_key(user_id))
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if (user is not None
+            and session.get(auth.BACKEND_SESSION_KEY)
+            in settings.AUTHENTICATION_BACKENDS
+            and session_hash
+            and constant_time_compare(session_hash,
+                                      user.get_session_auth_hash())):
+        return user
+    with routers.primary():
+        user = auth.get_user(request)
+    if user.is_authenticated:
+        cache.set(_key(user.pk), user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget(user_id):
+    """Drops the cached user now and once the transaction commits.
+
+    A request may cache the user of before the commit in between.
+    """
+    cache.delete(_key(user_id))
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(_key(user_id)))
@@ -1,5 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+from django.template import loader
+
+from core import mail
 
 User = get_user_model()
 
@@ -8,3 +11,18 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email', )
+
+
+class OutboxPasswordResetForm(PasswordResetForm):
+    """Queues the reset email instead of sending it during request."""
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = html_email_template_name and loader.render_to_string(
+            html_email_template_name, context
+        )
+        mail.enqueue(subject, body, [to_email], from_email, html_body)
@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.core import mail
 from django.test import TestCase
 from django.urls import reverse
 
+from core.mail import send_pending
+from core.models import Outbox
+
 User = get_user_model()
 
 
@@ -30,3 +34,22 @@ class FormsTest(TestCase):
             reverse('posts:index')
         )
         self.assertEqual(User.objects.count(), users_count + 1)
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            Outbox.objects.get().recipients,
+            FormsTest.form_data['email']
+        )
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertIn(FormsTest.form_data['username'], mail.outbox[0].body)
+
+    def test_password_reset_email_is_queued(self):
+        User.objects.create_user(username='user',
+                                 email='user@yandex.com',
+                                 password='asdfjkl;1')
+        self.client.post(reverse('users:password_reset'),
+                         data={'email': 'user@yandex.com'})
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['user@yandex.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from core.testing import run_commit_callbacks
+from posts.models import User
+
+from .. import auth
+
+PASSWORD = 'Old-password-1'
+
+
+class CachedAuthenticationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cachedUser',
+                                            password=PASSWORD)
+
+    def setUp(self):
+        cache.clear()
+        self.auth_client = Client()
+        self.auth_client.force_login(CachedAuthenticationTest.user)
+        self.url = reverse('about:author')
+
+    def test_session_and_user_are_read_from_cache(self):
+        response = self.auth_client.get(self.url)
+        self.assertEqual(response.context['user'],
+                         CachedAuthenticationTest.user)
+        with self.assertNumQueries(0):
+            response = self.auth_client.get(self.url)
+            self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_changed_user_is_read_again(self):
+        self.auth_client.get(self.url)
+        user = User.objects.get(pk=CachedAuthenticationTest.user.pk)
+        user.username = 'renamedUser'
+        user.save()
+        self.assertContains(self.auth_client.get(self.url), 'renamedUser')
+
+    def test_logout_forgets_user(self):
+        self.auth_client.get(self.url)
+        self.auth_client.get(reverse('users:logout'))
+        response = self.auth_client.get(self.url)
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_password_change_logs_out_other_sessions(self):
+        other_client = Client()
+        other_client.force_login(CachedAuthenticationTest.user)
+        other_client.get(self.url)
+        response = self.auth_client.post(
+            reverse('users:password_change'),
+            {'old_password': PASSWORD,
+             'new_password1': 'New-password-2',
+             'new_password2': 'New-password-2'},
+        )
+        self.assertRedirects(response, reverse('users:password_change_done'))
+        self.assertTrue(
+            self.auth_client.get(self.url).context['user'].is_authenticated
+        )
+        response = other_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_user_cached_before_commit_is_forgotten(self):
+        user = CachedAuthenticationTest.user
+        with run_commit_callbacks():
+            user.save()
+            # Another request reads the user before the save commits.
+            cache.set(auth._key(user.pk), user)
+        self.assertIsNone(cache.get(auth._key(user.pk)))
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_missing_user_is_read_from_default(self):
+        request = RequestFactory().get(self.url)
+        request.session = self.auth_client.session
+        routers.reset()
+        self.addCleanup(routers.reset)
+        routers.mark_synced('replica', routers.current_point())
+        routers.read_from_replicas()
+        # The replica alias has no database in tests, reading it fails.
+        self.assertEqual(auth.get_user(request),
+                         CachedAuthenticationTest.user)
@@ -6,6 +6,7 @@ from django.contrib.auth.views import (
 from django.urls import path
 
 from . import views
+from .forms import OutboxPasswordResetForm
 
 app_name = 'users'
 
@@ -27,7 +28,8 @@ urlpatterns = [
          name='password_change_done'),
     path('password_reset/',
          PasswordResetView
-         .as_view(template_name='users/password_reset.html'),
+         .as_view(template_name='users/password_reset.html',
+                  form_class=OutboxPasswordResetForm),
          name='password_reset'),
     path('password_reset/done/',
          PasswordResetDoneView
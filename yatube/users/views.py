@@ -1,6 +1,8 @@
-from django.core.mail import send_mail
+from django.db import transaction
 from django.shortcuts import redirect, render
 
+from core import mail
+from core.db import retry_on_busy
 from users.forms import CreationForm
 
 
@@ -13,14 +15,16 @@ def send_msg(login, email):
     С уважением, команда Yatube.
 
     """
-    send_mail(subject, body, 'adminyatube@yandex.ru', [email, ])
+    mail.enqueue(subject, body, [email, ], 'adminyatube@yandex.ru')
 
 
+@retry_on_busy
 def sing_up(request):
     form = CreationForm(request.POST or None)
     if form.is_valid():
-        send_msg(form.cleaned_data['username'],
-                 form.cleaned_data['email'])
-        form.save()
+        # The email is queued only together with the saved user.
+        with transaction.atomic():
+            user = form.save()
+            send_msg(user.username, user.email)
         return redirect('posts:index')
     return render(request, 'users/signup.html', context={'form': form})
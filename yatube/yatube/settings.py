@@ -31,26 +31,32 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,9 +82,36 @@ DATABASES = {
     }
 }
 
+# Run by core.db.apply_pragmas on every new SQLite connection, see
+# settings_production for tuned values.
+SQLITE_PRAGMAS = {}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Aliases of DATABASES refreshed from default by sync_replicas, reads of
+# REPLICA_VIEWS go there. For REPLICA_PIN_SECONDS after a write a client
+# only reads replicas synced after it, so it is not shorter than
+# REPLICA_MAX_LAG.
+DATABASE_REPLICAS = []
+REPLICA_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+}
+# A replica not synced for this many seconds is skipped, see
+# core.routers.
+REPLICA_MAX_LAG = 60 * 5
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
+# Sessions are read from the cache and written through to the database.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Users of sessions are kept in the cache too, see users.auth.
+USER_CACHE_TIMEOUT = 60 * 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,6 +151,65 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.MeteredLocMemCache',
     }
 }
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 6
+# Whole pages of anonymous users, 0 turns the page cache off.
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Sorted ids of followed authors per user, see posts.follows.
+FOLLOWS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# yatube.wsgi warms every worker up before its first request, see
+# core.warmup. Views of WARMUP_VIEWS are requested without arguments.
+WARMUP_ON_START = False
+WARMUP_VIEWS = [
+    'posts:index',
+    'posts:search',
+    'about:author',
+    'users:login',
+    'users:signup',
+]
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
+# Most SQL queries a request to the URL name may make, session and user
+# lookups included. Checked by core.testing.QueryBudgetMixin in tests
+# and by core.middleware.QueryBudgetMiddleware when
+# QUERY_BUDGET_ACTION is 'log' or 'reject'.
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:follow_index': 3,
+    'posts:group_list': 5,
+    'posts:profile': 6,
+    'posts:search': 3,
+    'posts:post_detail': 5,
+    'posts:post_comments': 5,
+    'posts:post_create': 9,
+    'posts:post_edit': 7,
+    'posts:add_comment': 7,
+    'posts:profile_follow': 15,
+    'posts:profile_unfollow': 14,
+}
+
+QUERY_BUDGET_ACTION = None
+
+# Share of requests profiled by core.middleware.ProfilingMiddleware,
+# requests with a token of the profile_token command in PROFILE_HEADER
+# are profiled always. PROFILE_MODE is 'cprofile' or 'sample'.
+PROFILE_RATE = 0
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+PROFILE_MODE = 'sample'
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_KEEP = 50
+PROFILE_MAX_BYTES = 100 * 1024 * 1024
+
+# Set to a directory shared by worker processes so that /metrics sums
+# all of them, None keeps metrics of the serving process only.
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+# None allows any address.
+METRICS_ALLOWED_IPS = INTERNAL_IPS
@@ -0,0 +1,70 @@
+"""Production profile, used with DJANGO_SETTINGS_MODULE pointing here."""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (BASE_DIR, DATABASES, INSTALLED_APPS, MIDDLEWARE,
+                       SECRET_KEY, TEMPLATES)
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', SECRET_KEY)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+
+# Templates are compiled once per worker and kept in memory.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+WARMUP_ON_START = True
+
+# Keep connections between requests, pragmas are applied once per
+# connection.
+DATABASES['default']['CONN_MAX_AGE'] = 60 * 10
+
+SQLITE_PRAGMAS = {
+    # Readers never block the writer and the writer never blocks them.
+    'journal_mode': 'wal',
+    # Safe with WAL: a power loss may only lose the last commits.
+    'synchronous': 'normal',
+    # Milliseconds a writer waits for the lock before failing.
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are KiB, 64 MiB of page cache per connection.
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
+# A local file copy stands in for a replica, see sync_replicas.
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+    'CONN_MAX_AGE': 60 * 10,
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = ['replica']
+
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+
+# Shared by all workers on the host, so versions bumped by a write are
+# seen by every process, not only the one that handled the write.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.MeteredSQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {'MAX_BYTES': 256 * 1024 * 1024},
+    }
+}